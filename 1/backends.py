@@ -0,0 +1,478 @@
+# galois and numpy are imported where they are needed so prime field arithmetic loads neither of them
+try:
+    import gmpy2
+    _element = gmpy2.mpz
+    _invert = gmpy2.invert
+except ImportError:
+    gmpy2 = None
+    _element = int
+    def _invert(a, p):
+        return pow(a, -1, p)
+
+
+# Field arithmetic for prime fields GF(p), elements are plain ints (or gmpy2 mpz) reduced mod p
+class PrimeFieldBackend:
+
+    def __init__(self, p: int, a: int, b: int):
+        self.p = p
+        self.order = p
+        self.a = self.element(a)
+        self.b = self.element(b)
+        self.inv2 = self.element((p + 1) // 2)
+        self._non_residue = None
+
+    @property
+    def properties(self) -> str:
+        return f"GF({self.p}) with native integer arithmetic"
+
+    def element(self, value):
+        return _element(int(value)) % self.p
+
+    def inv(self, value):
+        if value % self.p == 0:
+            raise ZeroDivisionError("Can't invert zero")
+        return _element(_invert(value, self.p))
+
+    def mul(self, x, y):
+        return x * y % self.p
+
+    # Montgomery's trick, inverts all values with a single field inversion
+    def batch_inv(self, values):
+        p = self.p
+        prefix = []
+        acc = 1
+        for value in values:
+            prefix.append(acc)
+            acc = acc * value % p
+        acc_inv = self.inv(acc)
+        result = [None] * len(values)
+        for i in range(len(values) - 1, -1, -1):
+            result[i] = acc_inv * prefix[i] % p
+            acc_inv = acc_inv * values[i] % p
+        return result
+
+    def is_square(self, value) -> bool:
+        return self.p == 2 or pow(value, (self.p - 1) // 2, self.p) == 1
+
+    # Square root of value, the root with the smallest integer representation or None for non-residues
+    def sqrt(self, value):
+        p = self.p
+        value = value % p
+        if value == 0 or p == 2:
+            return value
+        if p % 4 == 3:
+            # a candidate root that doesn't square back to value shows value is a non-residue
+            root = pow(value, (p + 1) // 4, p)
+            if root * root % p != value:
+                return None
+        elif pow(value, (p - 1) // 2, p) != 1:
+            return None
+        else:
+            root = self._tonelli_shanks(value)
+        return min(root, p - root)
+
+    def _tonelli_shanks(self, value):
+        p = self.p
+        q = p - 1
+        s = 0
+        while q % 2 == 0:
+            q //= 2
+            s += 1
+        if self._non_residue is None:
+            z = 2
+            while pow(z, (p - 1) // 2, p) != p - 1:
+                z += 1
+            self._non_residue = self.element(z)
+        m = s
+        c = pow(self._non_residue, q, p)
+        t = pow(value, q, p)
+        root = pow(value, (q + 1) // 2, p)
+        while t != 1:
+            i = 0
+            t_2i = t
+            while t_2i != 1:
+                t_2i = t_2i * t_2i % p
+                i += 1
+            b = pow(c, 1 << (m - i - 1), p)
+            m = i
+            c = b * b % p
+            t = t * c % p
+            root = root * b % p
+        return root
+
+    # Co-Z formulas for the Montgomery ladder (Goundar, Joye, Miyaji). Both points share one z and are passed as
+    # (x, y), every formula returns the factor the common z is multiplied by.
+    # Doubling of an affine point, returns 2P and P on the common z = 2y
+    def cz_double(self, x, y):
+        p = self.p
+        x_2 = x * x % p
+        y_2 = y * y % p
+        y_4 = y_2 * y_2 % p
+        s = 4 * x * y_2 % p
+        m = (3 * x_2 + self.a) % p
+        x2 = (m * m - 2 * s) % p
+        y2 = (m * (s - x2) - 8 * y_4) % p
+        return (x2, y2), (s, 8 * y_4 % p), 2 * y % p
+
+    # P + Q and P on the new common z, the factor is x1 - x2
+    def cz_add(self, P, Q):
+        p = self.p
+        (x1, y1), (x2, y2) = P, Q
+        dx = (x1 - x2) % p
+        c = dx * dx % p
+        w1 = x1 * c % p
+        w2 = x2 * c % p
+        dy = (y1 - y2) % p
+        a1 = y1 * (w1 - w2) % p
+        x3 = (dy * dy - w1 - w2) % p
+        y3 = (dy * (w1 - x3) - a1) % p
+        return (x3, y3), (w1, a1), dx
+
+    # P + Q and P - Q on the new common z, the factor is x1 - x2
+    def cz_add_sub(self, P, Q):
+        p = self.p
+        (x1, y1), (x2, y2) = P, Q
+        dx = (x1 - x2) % p
+        c = dx * dx % p
+        w1 = x1 * c % p
+        w2 = x2 * c % p
+        dy = (y1 - y2) % p
+        a1 = y1 * (w1 - w2) % p
+        x3 = (dy * dy - w1 - w2) % p
+        y3 = (dy * (w1 - x3) - a1) % p
+        sy = (y1 + y2) % p
+        x4 = (sy * sy - w1 - w2) % p
+        y4 = (sy * (w1 - x4) - a1) % p
+        return (x3, y3), (x4, y4), dx
+
+    # Elementwise arithmetic on numpy arrays of reduced elements for PointBatch, int64 while products of two
+    # elements fit and Python ints otherwise
+    def array(self, values):
+        import numpy as np
+        dtype = np.int64 if self.p < 1 << 31 else object
+        return np.array([int(value) for value in values], dtype=dtype) % self.p
+
+    def array_add(self, x, y):
+        return (x + y) % self.p
+
+    def array_sub(self, x, y):
+        return (x - y) % self.p
+
+    def array_neg(self, x):
+        return -x % self.p
+
+    def array_mul(self, x, y):
+        return x * y % self.p
+
+    # c * x for a field element or small int c
+    def array_scale(self, x, c):
+        return int(c) % self.p * x % self.p
+
+    def array_is_zero(self, x):
+        return x == 0
+
+    def array_where(self, mask, x, y):
+        import numpy as np
+        return np.where(mask, x, y)
+
+    # check y^2=x^3+axz^4+bz^6
+    def is_on_curve(self, x, y, z) -> bool:
+        p = self.p
+        z_2 = z * z % p
+        z_4 = z_2 * z_2 % p
+        return (y * y - x * x * x - self.a * x * z_4 - self.b * z_4 * z_2) % p == 0
+
+    # P == Q for finite points, x1 z2^2 = x2 z1^2 and y1 z2^3 = y2 z1^3
+    def equal(self, P, Q) -> bool:
+        p = self.p
+        z1_2 = P.z * P.z % p
+        z2_2 = Q.z * Q.z % p
+        return (P.x * z2_2 - Q.x * z1_2) % p == 0 and (P.y * z2_2 * Q.z - Q.y * z1_2 * P.z) % p == 0
+
+    def to_affine(self, x, y, z):
+        if z == 1:
+            return x, y
+        p = self.p
+        z_inv = self.inv(z)
+        z_inv_2 = z_inv * z_inv % p
+        return x * z_inv_2 % p, y * z_inv_2 * z_inv % p
+
+    # Jacobian addition, with the multiplications by z skipped for operands with z = 1 (mixed addition)
+    def add(self, P, Q):
+        p = self.p
+        x1, y1, z1 = P.x, P.y, P.z
+        x2, y2, z2 = Q.x, Q.y, Q.z
+        if z2 == 1:
+            lambda1 = x1
+            lambda4 = y1
+        else:
+            z2_2 = z2 * z2 % p
+            lambda1 = x1 * z2_2 % p
+            lambda4 = y1 * z2_2 * z2 % p
+        if z1 == 1:
+            lambda2 = x2
+            lambda5 = y2
+        else:
+            z1_2 = z1 * z1 % p
+            lambda2 = x2 * z1_2 % p
+            lambda5 = y2 * z1_2 * z1 % p
+        lambda3 = (lambda1 - lambda2) % p
+        lambda6 = (lambda4 - lambda5) % p
+        if lambda3 == 0 and lambda6 == 0:
+            # P == Q, the caller has to double instead
+            return None
+        lambda7 = lambda1 + lambda2
+        lambda8 = lambda4 + lambda5
+        z3 = z1 * z2 * lambda3 % p
+        lambda3_2 = lambda3 * lambda3 % p
+        lambda7_3_2 = lambda7 * lambda3_2 % p
+        x3 = (lambda6 * lambda6 - lambda7_3_2) % p
+        lambda9 = lambda7_3_2 - 2 * x3
+        y3 = (lambda9 * lambda6 - lambda8 * lambda3 * lambda3_2) * self.inv2 % p
+        return x3, y3, z3
+
+    def double(self, P):
+        p = self.p
+        x1, y1, z1 = P.x, P.y, P.z
+        if z1 == 1:
+            lambda1 = (3 * x1 * x1 + self.a) % p
+            z3 = 2 * y1 % p
+        else:
+            z1_2 = z1 * z1 % p
+            lambda1 = (3 * x1 * x1 + self.a * z1_2 * z1_2) % p
+            z3 = 2 * y1 * z1 % p
+        y_2 = y1 * y1 % p
+        lambda2 = 4 * x1 * y_2 % p
+        x3 = (lambda1 * lambda1 - 2 * lambda2) % p
+        lambda3 = 8 * y_2 * y_2
+        y3 = (lambda1 * (lambda2 - x3) - lambda3) % p
+        return x3, y3, z3
+
+
+# Parameters (irreducible polynomial, primitive element) of the galois fields built so far, keyed by the field order.
+# A field built from known parameters skips the primitive element search and verification, which for large primes
+# takes minutes. The curve registry persists them
+galois_field_parameters = {}
+# Orders whose parameters came from outside this process (e.g. a registry file) and haven't been verified yet
+_unverified_galois_fields = set()
+
+
+# Parameters read from elsewhere, galois checks them once when the field is first built and a field whose parameters
+# fail the check is built from scratch. Parameters already known for the order are kept
+def add_galois_field_parameters(order: int, irreducible_poly: int, primitive_element: int):
+    if order not in galois_field_parameters:
+        galois_field_parameters[order] = (irreducible_poly, primitive_element)
+        _unverified_galois_fields.add(order)
+
+
+def galois_field(p: int, n: int):
+    import galois
+    order = p ** n
+    parameters = galois_field_parameters.get(order)
+    if parameters is None:
+        F = galois.GF(order)
+        galois_field_parameters[order] = (int(F.irreducible_poly), int(F.primitive_element))
+        return F
+    irreducible_poly, primitive_element = parameters
+    verify = order in _unverified_galois_fields
+    try:
+        if n == 1:
+            F = galois.GF(p, primitive_element=primitive_element, verify=verify)
+        else:
+            F = galois.GF(order, irreducible_poly=irreducible_poly, primitive_element=primitive_element, verify=verify)
+    except ValueError:
+        if not verify:
+            raise
+        del galois_field_parameters[order]
+        _unverified_galois_fields.discard(order)
+        return galois_field(p, n)
+    _unverified_galois_fields.discard(order)
+    return F
+
+
+# Field arithmetic for any GF(p^n) through galois FieldArray scalars
+class GaloisFieldBackend:
+
+    def __init__(self, p: int, n: int, a: int, b: int):
+        self.F = galois_field(p, n)
+        self.p = p
+        self.order = p ** n
+        self.a = self.F(a)
+        self.b = self.F(b)
+        self._0 = self.F(0)
+        self._2 = self.F(2 % p)
+        self._3 = self.F(3 % p)
+        self._4 = self.F(4 % p)
+        self._8 = self.F(8 % p)
+        # 1 / F(2) as in the original curve code, F(2) is the element with integer representation 2 and not zero
+        # in characteristic 2
+        self.inv2 = self.F(1) / self.F(2)
+
+    @property
+    def properties(self) -> str:
+        return str(self.F.properties)
+
+    def element(self, value):
+        return self.F(value)
+
+    def inv(self, value):
+        return self.F(1) / value
+
+    def mul(self, x, y):
+        return x * y
+
+    # Montgomery's trick, inverts all values with a single field inversion
+    def batch_inv(self, values):
+        prefix = []
+        acc = self.F(1)
+        for value in values:
+            prefix.append(acc)
+            acc = acc * value
+        acc_inv = self.inv(acc)
+        result = [None] * len(values)
+        for i in range(len(values) - 1, -1, -1):
+            result[i] = acc_inv * prefix[i]
+            acc_inv = acc_inv * values[i]
+        return result
+
+    def is_square(self, value) -> bool:
+        return self.p == 2 or (value != self._0 and bool(value.is_square()))
+
+    # Square root of value, the root with the smallest integer representation or None for non-squares
+    def sqrt(self, value):
+        if not value.is_square():
+            return None
+        import numpy as np
+        root = np.sqrt(value.reshape(1))[0]
+        return min(root, -root, key=int)
+
+    # Co-Z formulas for the Montgomery ladder (Goundar, Joye, Miyaji). Both points share one z and are passed as
+    # (x, y), every formula returns the factor the common z is multiplied by.
+    # Doubling of an affine point, returns 2P and P on the common z = 2y
+    def cz_double(self, x, y):
+        y_2 = y**2
+        y_4 = y_2**2
+        s = self._4 * x * y_2
+        m = self._3 * x**2 + self.a
+        x2 = m**2 - self._2 * s
+        y2 = m * (s - x2) - self._8 * y_4
+        return (x2, y2), (s, self._8 * y_4), self._2 * y
+
+    # P + Q and P on the new common z, the factor is x1 - x2
+    def cz_add(self, P, Q):
+        (x1, y1), (x2, y2) = P, Q
+        dx = x1 - x2
+        c = dx**2
+        w1 = x1 * c
+        w2 = x2 * c
+        dy = y1 - y2
+        a1 = y1 * (w1 - w2)
+        x3 = dy**2 - w1 - w2
+        y3 = dy * (w1 - x3) - a1
+        return (x3, y3), (w1, a1), dx
+
+    # P + Q and P - Q on the new common z, the factor is x1 - x2
+    def cz_add_sub(self, P, Q):
+        (x1, y1), (x2, y2) = P, Q
+        dx = x1 - x2
+        c = dx**2
+        w1 = x1 * c
+        w2 = x2 * c
+        dy = y1 - y2
+        a1 = y1 * (w1 - w2)
+        x3 = dy**2 - w1 - w2
+        y3 = dy * (w1 - x3) - a1
+        sy = y1 + y2
+        x4 = sy**2 - w1 - w2
+        y4 = sy * (w1 - x4) - a1
+        return (x3, y3), (x4, y4), dx
+
+    # Elementwise arithmetic on FieldArrays for PointBatch
+    def array(self, values):
+        return self.F([int(value) for value in values])
+
+    def array_add(self, x, y):
+        return x + y
+
+    def array_sub(self, x, y):
+        return x - y
+
+    def array_neg(self, x):
+        return -x
+
+    def array_mul(self, x, y):
+        return x * y
+
+    # c * x for a field element or an int, ints are taken mod p as elements of the prime subfield
+    def array_scale(self, x, c):
+        if isinstance(c, int):
+            c = self.F(c % self.p)
+        return c * x
+
+    def array_is_zero(self, x):
+        return x == self._0
+
+    def array_where(self, mask, x, y):
+        import numpy as np
+        return np.where(mask, x, y).view(self.F)
+
+    # check y^2=x^3+axz^4+bz^6
+    def is_on_curve(self, x, y, z) -> bool:
+        return (y**2) == (x**3) + (self.a * x * z**4) + (self.b * z**6)
+
+    # P == Q for finite points, x1 z2^2 = x2 z1^2 and y1 z2^3 = y2 z1^3
+    def equal(self, P, Q) -> bool:
+        z1_2 = P.z**2
+        z2_2 = Q.z**2
+        return P.x * z2_2 == Q.x * z1_2 and P.y * z2_2 * Q.z == Q.y * z1_2 * P.z
+
+    def to_affine(self, x, y, z):
+        if z == 1:
+            return x, y
+        z_inv = self.inv(z)
+        z_inv_2 = z_inv**2
+        return x * z_inv_2, y * z_inv_2 * z_inv
+
+    # Jacobian addition, with the multiplications by z skipped for operands with z = 1 (mixed addition)
+    def add(self, P, Q):
+        if Q.z == 1:
+            lambda1 = P.x
+            lambda4 = P.y
+        else:
+            z2_2 = Q.z**2
+            lambda1 = P.x * z2_2
+            lambda4 = P.y * z2_2 * Q.z
+        if P.z == 1:
+            lambda2 = Q.x
+            lambda5 = Q.y
+        else:
+            z1_2 = P.z**2
+            lambda2 = Q.x * z1_2
+            lambda5 = Q.y * z1_2 * P.z
+        lambda3 = lambda1 - lambda2
+        lambda6 = lambda4 - lambda5
+        if lambda3 == self._0 and lambda6 == self._0:
+            # P == Q, the caller has to double instead
+            return None
+        lambda7 = lambda1 + lambda2
+        lambda8 = lambda4 + lambda5
+        z3 = P.z * Q.z * lambda3
+        lambda3_2 = lambda3**2
+        x3 = lambda6**2 - lambda7 * lambda3_2
+        lambda9 = lambda7 * lambda3_2 - self._2 * x3
+        y3 = (lambda9 * lambda6 - lambda8 * lambda3*lambda3_2) * self.inv2
+        return x3, y3, z3
+
+    def double(self, P):
+        if P.z == 1:
+            lambda1 = self._3 * P.x**2 + self.a
+            z3 = self._2 * P.y
+        else:
+            lambda1 = self._3 * P.x**2 + self.a * P.z**4
+            z3 = self._2 * P.y * P.z
+        y_2 = P.y**2
+        lambda2 = self._4 * P.x * y_2
+        x3 = lambda1**2 - self._2 * lambda2
+        lambda3 = self._8 * y_2**2
+        y3 = lambda1 * (lambda2 - x3) - lambda3
+        return x3, y3, z3
@@ -0,0 +1,315 @@
+from elliptic_curve import *
+from el_gamal import *
+from scalar_mult import SCALAR_METHODS
+from parallel import encrypt_parallel, parallel_rho
+from ciphertext_file import write_ciphertexts, read_ciphertexts
+from curve_registry import get_curve, save_registry
+import subprocess
+import sys
+from number_theory import factorint, is_prime
+from math import pi, sqrt
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+
+def timed(function, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def bench_scalar_mul(repeat: int = 20):
+    scalar = 345678123
+    results = {}
+    for backend in ["galois", "int"]:
+        curve = EllipticCurve(1, 1, 1000003, 1, backend=backend)
+        p1 = EllipticPoint(curve, 613420, 643318, 1)
+        elapsed, result = timed(lambda: p1 * scalar, repeat)
+        results[backend] = elapsed
+        print(f"{backend:>8} backend: [{scalar}]P in {elapsed * 1000:.3f} ms -> x = {curve.map_from_point(result)}")
+    print(f"Speedup: {results['galois'] / results['int']:.1f}x")
+
+
+def bench_scalar_methods(repeat: int = 20):
+    curve = EllipticCurve(1, 1, 1000003, 1)
+    p1 = EllipticPoint(curve, 613420, 643318, 1)
+    for bits in [20, 64, 256]:
+        scalar = random.getrandbits(bits) | (1 << (bits - 1))
+        for method in SCALAR_METHODS:
+            elapsed, _ = timed(lambda: p1.multiply(scalar, method), repeat)
+            print(f"{bits:>4} bit scalar, {method:>14}: {elapsed * 1000:.3f} ms")
+
+
+def bench_elgamal(messages: int = 200):
+    for method in SCALAR_METHODS:
+        curve = EllipticCurve(1, 1, 1000003, 1, scalar_method=method)
+        elgamal = ElGamal(curve, G=EllipticPoint(curve, 613420, 643318, 1))
+        message_point = curve.map_to_point(101)
+        encrypt_time, (c1, c2) = timed(lambda: encrypt(curve, elgamal.get_public_key(), elgamal.get_point(), message_point), messages)
+        decrypt_time, _ = timed(lambda: elgamal.decrypt(c1, c2), messages)
+        print(f"{method:>14}: encrypt {encrypt_time * 1000:.3f} ms, decrypt {decrypt_time * 1000:.3f} ms")
+
+
+# Encrypting many messages to the same key, with fixed-base tables against plain point multiplication
+def bench_fixed_base(messages: int = 2000):
+    curve = EllipticCurve(1, 1, 1000003, 1)
+    elgamal = ElGamal(curve, G=EllipticPoint(curve, 613420, 643318, 1))
+    G = elgamal.get_point()
+    public_key = elgamal.get_public_key()
+    message_point = curve.map_to_point(101)
+
+    def encrypt_without_tables():
+        r = curve.random_scalar()
+        return (G * r, message_point + public_key * r)
+
+    plain_time, _ = timed(encrypt_without_tables, messages)
+    table_time, _ = timed(lambda: encrypt(curve, public_key, G, message_point), messages)
+    print(f"{messages} messages: {plain_time * messages:.3f} s without tables, {table_time * messages:.3f} s with fixed-base tables ({plain_time / table_time:.1f}x)")
+
+
+# Memory held by a list of points from get_cyclic_group against walking the same multiples lazily
+def bench_point_memory(points: int = 20000):
+    curve = EllipticCurve(1, 1, 1000003, 1)
+    p1 = EllipticPoint(curve, 613420, 643318, 1)
+    tracemalloc.start()
+    group = p1.get_cyclic_group(points)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"get_cyclic_group({points}): {size / len(group):.0f} bytes per point")
+    del group
+    for affine in (False, True):
+        tracemalloc.start()
+        for _ in p1.iter_multiples(limit=points, affine=affine):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"iter_multiples(limit={points}, affine={affine}): {peak / 1024:.0f} KiB peak")
+
+
+# The linear search for y that map_to_point used before it had a field square root
+def linear_map_to_point(curve: EllipticCurve, number: int):
+    x = curve.F(number)
+    rhs = curve.F(x**3 + curve.a * x + curve.b)
+    if curve.backend.is_square(rhs):
+        for y in range(curve.field_size):
+            y = curve.F(y)
+            if curve.F(y**2) == rhs:
+                return EllipticPoint(curve, x, y, 1, check=False)
+    raise ValueError("No point found for this number")
+
+
+def bench_map_to_point(numbers: int = 5):
+    curve = EllipticCurve(1, 1, 1000003, 1)
+    encodable = [number for number in range(100, 200) if curve.backend.is_square(curve.F(number**3 + number + 1))][:numbers]
+    linear_time, _ = timed(lambda: [linear_map_to_point(curve, number) for number in encodable])
+    sqrt_time, _ = timed(lambda: [curve.map_to_point(number) for number in encodable], 100)
+    print(f"map_to_point on {len(encodable)} numbers: {linear_time * 1000:.3f} ms with linear search, {sqrt_time * 1000:.3f} ms with sqrt ({linear_time / sqrt_time:.0f}x)")
+
+
+# Throughput of encrypt_parallel in messages per second against the number of worker processes
+def bench_parallel(messages: int = 20000, chunk_size: int = 256):
+    curve = EllipticCurve(1, 1, 1000003, 1)
+    elgamal = ElGamal(curve, G=EllipticPoint(curve, 613420, 643318, 1))
+    message_points = [curve.map_to_point(101)] * messages
+    elapsed, _ = timed(lambda: encrypt_many(curve, elgamal.get_public_key(), elgamal.get_point(), message_points))
+    print(f"  serial: {messages / elapsed:.0f} messages/s")
+    cores = os.cpu_count() or 1
+    workers = 1
+    while True:
+        elapsed, _ = timed(lambda: list(encrypt_parallel(curve, elgamal.get_public_key(), elgamal.get_point(), message_points, workers, chunk_size)))
+        print(f"{workers:>2} cores: {messages / elapsed:.0f} messages/s")
+        if workers >= cores:
+            break
+        workers = min(2 * workers, cores)
+
+
+# On-curve checks and encryption of many points with Python loops against whole-array PointBatch operations
+def bench_point_batch(points: int = 500):
+    from point_batch import PointBatch
+    for backend in ["galois", "int"]:
+        curve = EllipticCurve(1, 1, 1000003, 1, backend=backend)
+        elgamal = ElGamal(curve, G=EllipticPoint(curve, 613420, 643318, 1))
+        batch = [curve.random_point() for _ in range(points)]
+        loop_time, _ = timed(lambda: all(curve.is_projective_point_on_curve(point.x, point.y, point.z) for point in batch))
+        batch_time, _ = timed(lambda: PointBatch.from_points(curve, batch).is_on_curve().all())
+        print(f"{backend:>8} backend: {points} on-curve checks {loop_time * 1000:.1f} ms in a loop, {batch_time * 1000:.1f} ms batched ({loop_time / batch_time:.1f}x)")
+        loop_time, _ = timed(lambda: encrypt_many(curve, elgamal.get_public_key(), elgamal.get_point(), batch))
+        batch_time, _ = timed(lambda: encrypt_batch(curve, elgamal.get_public_key(), elgamal.get_point(), batch))
+        print(f"{backend:>8} backend: {points} encryptions {loop_time * 1000:.1f} ms in a loop, {batch_time * 1000:.1f} ms batched ({loop_time / batch_time:.1f}x)")
+
+
+# NIST P-256 parameters (a, b, p, n) and generator
+P256 = (-3, 0x5ac635d8aa3a93e7b3ebbd55769886bc651d06b0cc53b0f63bce3c3e27d2604b, 2**256 - 2**224 + 2**192 + 2**96 - 1, 1)
+P256_G = (0x6b17d1f2e12c4247f8bce6e563a440f277037d812deb33a0f4a13945d898c296, 0x4fe342e2fe1a7f9b8ee7eb4a7c0f9e162bce33576b315ececbb6406837bf51f5)
+
+
+# ElGamal decryption throughput with the default wNAF multiplication against the constant-time ladder
+def bench_ladder(messages: int = 200):
+    curve = EllipticCurve(*P256)
+    G = EllipticPoint(curve, *P256_G)
+    message_points = [curve.random_point() for _ in range(messages)]
+    for method in [None, "ladder"]:
+        elgamal = ElGamal(curve, G=G, scalar_method=method)
+        ciphertexts = encrypt_many(curve, elgamal.get_public_key(), G, message_points)
+        elapsed, _ = timed(lambda: [elgamal.decrypt(c1, c2) for c1, c2 in ciphertexts])
+        print(f"{method or 'wnaf':>8}: {messages / elapsed:.0f} decryptions/s")
+
+
+# Timing leakage harness: decryption times for a sparse and a random private key of the same length, interleaved in random order so drift
+# hits both classes alike, compared with Welch's t statistic. |t| above about 4.5 means the timing depends on the key
+def ladder_timing_variance(samples: int = 300):
+    curve = EllipticCurve(*P256)
+    G = EllipticPoint(curve, *P256_G)
+    bits = curve.field_size.bit_length()
+    keys = {"sparse": (1 << (bits - 1)) | 1, "random": (1 << (bits - 1)) | random.getrandbits(bits - 1)}
+    c1, c2 = encrypt(curve, EllipticPoint(curve, *P256_G), G, curve.random_point())
+    for method in [None, "ladder"]:
+        decryptors = {name: ElGamal(curve, G=G, private_key=key, scalar_method=method) for name, key in keys.items()}
+        times = {name: [] for name in keys}
+        order = list(keys) * samples
+        random.shuffle(order)
+        for name in order:
+            start = time.perf_counter()
+            decryptors[name].decrypt(c1, c2)
+            times[name].append(time.perf_counter() - start)
+        sparse, full = times["sparse"], times["random"]
+        t = (statistics.mean(sparse) - statistics.mean(full)) / (statistics.variance(sparse) / samples + statistics.variance(full) / samples) ** 0.5
+        print(f"{method or 'wnaf':>8}: sparse key {statistics.mean(sparse) * 1000:.3f} ms (sd {statistics.stdev(sparse) * 1000:.3f}), "
+              f"random key {statistics.mean(full) * 1000:.3f} ms (sd {statistics.stdev(full) * 1000:.3f}), t = {t:.1f}")
+
+
+# Size and throughput of the binary ciphertext container against the text of str(point)
+def bench_ciphertext_file(messages: int = 2000):
+    curve = EllipticCurve(*P256)
+    G = EllipticPoint(curve, *P256_G)
+    elgamal = ElGamal(curve, G=G)
+    ciphertexts = encrypt_many(curve, elgamal.get_public_key(), G, [curve.random_point() for _ in range(messages)])
+    text_size = sum(len(str(c1)) + len(str(c2)) for c1, c2 in ciphertexts)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "ciphertexts.bin")
+        for compressed in [False, True]:
+            write_time, _ = timed(lambda: write_ciphertexts(path, curve, ciphertexts, compressed))
+            read_time, _ = timed(lambda: read_ciphertexts(curve, path))
+            print(f"compressed={compressed!s:>5}: {os.path.getsize(path) / messages:.0f} bytes per ciphertext (str: {text_size / messages:.0f}), "
+                  f"write {messages / write_time:.0f}/s, read {messages / read_time:.0f}/s")
+
+
+# Curve and ElGamal setup with a new curve every time against the registry, in this process and in a new process
+# started with and without a saved registry. curves are the parameters (a, b, p, n, backend) of the curves to set up
+def bench_curve_registry(curves=((1, 1, 1000003, 1, "int"), (1, 1, 1000003, 1, "galois"), (1, 2, 3, 9, "galois")), repeat: int = 5):
+    def setup(make_curve):
+        for a, b, p, n, backend in curves:
+            curve = make_curve(a, b, p, n, backend)
+            curve.order()
+            ElGamal(curve, G=curve.random_point())
+
+    fresh_time, _ = timed(lambda: setup(EllipticCurve), repeat)
+    registry_time, _ = timed(lambda: setup(get_curve), repeat)
+    print(f"setup in process: {fresh_time * 1000:.1f} ms with new curves, {registry_time * 1000:.1f} ms with the registry")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "registry.json")
+        save_registry(path)
+        script = ("import sys; from curve_registry import *; from el_gamal import *\n"
+                  "if len(sys.argv) > 1: load_registry(sys.argv[1])\n"
+                  f"for a, b, p, n, backend in {curves!r}:\n"
+                  "    curve = get_curve(a, b, p, n, backend); curve.order(); ElGamal(curve, G=curve.random_point())\n")
+        for arguments in [[], [path]]:
+            elapsed, _ = timed(lambda: subprocess.run([sys.executable, "-c", script, *arguments], check=True))
+            print(f"new process {'with' if arguments else 'without'} saved registry: {elapsed:.2f} s")
+
+
+# Cold start latency of a new process that imports el_gamal, generates a key and encrypts one message,
+# and the heavy modules it ended up importing
+def bench_cold_start(repeat: int = 3):
+    script = ("import sys; from el_gamal import *\n"
+              "curve = EllipticCurve(1, 1, 1000003, 1, backend=sys.argv[1]) if sys.argv[1] != 'none' else None\n"
+              "if curve: elgamal = ElGamal(curve); encrypt(curve, elgamal.get_public_key(), elgamal.get_point(), curve.map_to_point(101))\n"
+              "print(' '.join(module for module in ('numpy', 'galois', 'sympy') if module in sys.modules) or '-')\n")
+    for backend in ["none", "int", "galois"]:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, "-c", script, backend], check=True, capture_output=True, text=True)
+            times.append(time.perf_counter() - start)
+        label = "import only" if backend == "none" else f"{backend} backend"
+        print(f"{label:>14}: {min(times):.3f} s, imported: {result.stdout.strip()}")
+
+
+# Dictionary-heavy work on points: building a dict of Jacobian points hashes each of them for the first time,
+# later lookups reuse the memoized hash. Without it every lookup pays an inversion like the first one
+def bench_point_hashing(points: int = 20000, lookups: int = 5):
+    curve = EllipticCurve(1, 1, 1000003, 1)
+    p1 = EllipticPoint(curve, 613420, 643318, 1)
+    multiples = list(p1.iter_multiples(limit=points))
+    backend = curve.backend
+    uncached_time, _ = timed(lambda: {hash(tuple(map(int, backend.to_affine(point.x, point.y, point.z)))): i for i, point in enumerate(multiples)})
+    first_time, index = timed(lambda: {point: i for i, point in enumerate(multiples)})
+    lookup_time, _ = timed(lambda: sum(index[point] for point in multiples), lookups)
+    print(f"{points} points: {uncached_time / points * 1e6:.2f} us per hash without memoization, "
+          f"{first_time / points * 1e6:.2f} us per insert, {lookup_time / points * 1e6:.2f} us per repeated lookup ({uncached_time / lookup_time:.1f}x)")
+
+
+# The smallest prime larger than n
+def next_prime(n: int) -> int:
+    n += 1
+    while not is_prime(n):
+        n += 1
+    return n
+
+
+# A curve over a bits long prime field with a point P whose prime order q is close to the curve order
+def curve_with_large_subgroup(bits: int):
+    p = next_prime(1 << bits)
+    b = 1
+    while True:
+        curve = EllipticCurve(1, b, p, 1)
+        q = max(factorint(curve.order()))
+        if 8 * q > curve.order():
+            while True:
+                P = curve.random_point().multiply(curve.order() // q)
+                if not P.is_infinity:
+                    return curve, P, q
+        b += 1
+
+
+# Iterations of parallel Pollard rho against the expected sqrt(pi q / 2) on subgroups of increasing size
+def bench_parallel_rho(sizes=(20, 24, 28, 32), trials: int = 5, workers: int = None):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    for bits in sizes:
+        curve, P, q = curve_with_large_subgroup(bits)
+        iterations = 0
+        start = time.perf_counter()
+        for _ in range(trials):
+            k = random.randrange(q)
+            stats = {}
+            if parallel_rho(P, P.multiply(k), q, workers, stats=stats) != k:
+                raise ArithmeticError("parallel rho returned a wrong logarithm")
+            iterations += stats["iterations"]
+        elapsed = (time.perf_counter() - start) / trials
+        expected = sqrt(pi * q / 2)
+        print(f"{q.bit_length():>2} bit subgroup: {iterations / trials:.0f} iterations, expected {expected:.0f} "
+              f"({iterations / trials / expected:.2f}x), {elapsed:.2f} s with {workers} workers")
+
+
+if __name__ == "__main__":
+    bench_scalar_mul()
+    bench_scalar_methods()
+    bench_elgamal()
+    bench_fixed_base()
+    bench_map_to_point()
+    bench_point_memory()
+    bench_parallel()
+    bench_point_batch()
+    bench_ladder()
+    ladder_timing_variance()
+    bench_ciphertext_file()
+    bench_curve_registry()
+    bench_cold_start()
+    bench_point_hashing()
+    bench_parallel_rho()
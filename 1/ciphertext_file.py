@@ -0,0 +1,121 @@
+from el_gamal import *
+from itertools import islice
+import mmap
+import struct
+
+# Binary container for ElGamal ciphertexts. The header is MAGIC, the format version and the element size of the curve,
+# followed by one record per ciphertext. A record holds c1 and c2, each a SEC1 point encoding prefixed by its length
+MAGIC = b"ECCT"
+VERSION = 1
+_HEADER = struct.Struct(">4sBH")
+_LENGTH = struct.Struct(">H")
+
+
+# Write (c1, c2) pairs from any iterable to a path or a binary file object, returns the number of ciphertexts.
+# The points are normalized in batches so the encodings share one field inversion per batch
+def write_ciphertexts(file, curve: EllipticCurve, ciphertexts, compressed: bool=True) -> int:
+    if not hasattr(file, "write"):
+        with open(file, "wb") as f:
+            return write_ciphertexts(f, curve, ciphertexts, compressed)
+    file.write(_HEADER.pack(MAGIC, VERSION, curve.element_size))
+    ciphertexts = iter(ciphertexts)
+    count = 0
+    while True:
+        batch = list(islice(ciphertexts, AFFINE_BATCH_SIZE))
+        if not batch:
+            return count
+        points = [point for pair in batch for point in pair]
+        # checked before batch_to_affine, which rebuilds the points on curve
+        for point in points:
+            if point.curve != curve:
+                raise ValueError("Curve doesn't match with the curve of the points")
+        records = []
+        for point in curve.batch_to_affine(points):
+            encoding = point.to_bytes(compressed)
+            records.append(_LENGTH.pack(len(encoding)))
+            records.append(encoding)
+        file.write(b"".join(records))
+        count += len(batch)
+
+
+# The raw (c1, c2) encodings of every record in a buffer holding a container, as zero-copy memoryview slices.
+# Closing the generator releases its view of the buffer, so the buffer can be closed once the slices are released
+def iter_records(buffer, element_size: int=None):
+    view = memoryview(buffer)
+    pair = []
+    try:
+        if len(view) < _HEADER.size:
+            raise ValueError("Not a ciphertext file")
+        magic, version, size = _HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a ciphertext file or an unsupported version")
+        if element_size is not None and size != element_size:
+            raise ValueError("The ciphertexts were written for a curve with another field size")
+        offset = _HEADER.size
+        while offset < len(view):
+            if offset + _LENGTH.size > len(view):
+                raise ValueError("Truncated ciphertext file")
+            (length,) = _LENGTH.unpack_from(view, offset)
+            offset += _LENGTH.size
+            if offset + length > len(view):
+                raise ValueError("Truncated ciphertext file")
+            pair.append(view[offset:offset + length])
+            offset += length
+            if len(pair) == 2:
+                yield pair[0], pair[1]
+                pair = []
+        if pair:
+            raise ValueError("Truncated ciphertext file")
+    finally:
+        # a slice that was never yielded, the yielded ones belong to the caller
+        if len(pair) == 1:
+            pair[0].release()
+        try:
+            view.release()
+        except BufferError:
+            # slices held by the caller keep the buffer exported until they are gone
+            pass
+
+
+# Memory-mapped reader for a ciphertext file, iterating yields the decoded (c1, c2) pairs lazily.
+# The memoryviews from records() are only valid until the reader is closed
+class CiphertextReader:
+
+    def __init__(self, curve: EllipticCurve, path):
+        self.curve = curve
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def records(self):
+        return iter_records(self._map, self.curve.element_size)
+
+    def __iter__(self):
+        records = self.records()
+        try:
+            for c1, c2 in records:
+                try:
+                    yield self.curve.point_from_bytes(c1), self.curve.point_from_bytes(c2)
+                finally:
+                    c1.release()
+                    c2.release()
+        finally:
+            records.close()
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            self.close()
+        except BufferError:
+            # memoryviews from records() are still alive, don't let that hide the exception leaving the block
+            if exc_type is None:
+                raise
+
+
+def read_ciphertexts(curve: EllipticCurve, path):
+    with CiphertextReader(curve, path) as reader:
+        return list(reader)
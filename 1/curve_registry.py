@@ -0,0 +1,115 @@
+from el_gamal import *
+from backends import galois_field_parameters, add_galois_field_parameters
+from number_theory import is_prime
+from math import isqrt
+import json
+
+# Interned curves keyed by the parameters, backend, scalar method and validation policy of the curve
+_curves = {}
+# The interned curve for the arguments get_curve was called with, so equal arguments skip building a curve
+_curve_arguments = {}
+# Order, factorization and fixed-base tables loaded from disk, keyed by EllipticCurve.parameters()
+_persisted = {}
+
+
+# The curve with these parameters, created once per process and shared by every caller. Arguments describing the
+# same curve (e.g. a=-3 and a=p-3, or backend=None and the backend it picks) share one curve. Values saved with
+# save_registry are restored on creation, so the curve order isn't recomputed and the generator tables are built
+# up front
+def get_curve(a: int, b: int, p: int, n: int, backend: str=None, scalar_method: str="wnaf", validation: str="inputs") -> EllipticCurve:
+    arguments = (a, b, p, n, backend, scalar_method, validation)
+    curve = _curve_arguments.get(arguments)
+    if curve is None:
+        curve = EllipticCurve(a, b, p, n, backend, scalar_method, validation)
+        key = (curve.parameters(), curve.backend_name, scalar_method, validation)
+        if key in _curves:
+            curve = _curves[key]
+        else:
+            _restore(curve)
+            _curves[key] = curve
+        _curve_arguments[arguments] = curve
+    return curve
+
+
+def clear_registry():
+    _curves.clear()
+    _curve_arguments.clear()
+    _persisted.clear()
+
+
+def _restore(curve: EllipticCurve):
+    entry = _persisted.get(curve.parameters())
+    if entry is None:
+        return
+    if curve._order is None and entry["order"] is not None:
+        order = entry["order"]
+        factors = None if entry["order_factors"] is None else {int(q): e for q, e in entry["order_factors"].items()}
+        # a stale or edited file must not poison get_order, a value that fails the checks is recomputed when needed
+        if _valid_order(curve, order, factors):
+            curve._order = order
+            curve._order_factors = factors
+    tables = []
+    for saved in entry["tables"]:
+        # points read from the file are always checked, a point that isn't on the curve is dropped from the entry
+        # like an invalid order so it isn't tried again. The table is built again rather than read back, which costs
+        # about one scalar multiplication and leaves nothing in the file to trust
+        try:
+            point = EllipticPoint(curve, *saved["point"], 1, check=True)
+        except ValueError:
+            continue
+        fixed_base_table(point)
+        tables.append(saved)
+    entry["tables"] = tables
+
+
+# The order is within the Hasse bound, annihilates a random point and the factorization is into primes multiplying
+# up to it
+def _valid_order(curve: EllipticCurve, order: int, factors) -> bool:
+    q = curve.field_size
+    if abs(order - q - 1) > isqrt(4 * q) or not curve.random_point().multiply(order).is_infinity:
+        return False
+    if factors is not None:
+        product = 1
+        for r, e in factors.items():
+            if e < 1 or not is_prime(r):
+                return False
+            product *= r ** e
+        if product != order:
+            return False
+    return True
+
+
+# Write the galois field parameters, curve orders and the points with fixed-base tables of the registered curves to a
+# JSON file
+def save_registry(path):
+    entries = {}
+    for curve in _curves.values():
+        entries.setdefault(curve.parameters(), {
+            "parameters": list(curve.parameters()),
+            "order": curve._order,
+            "order_factors": None if curve._order_factors is None else {str(q): e for q, e in curve._order_factors.items()},
+            "tables": [],
+        })
+    for curve in _curves.values():
+        entry = entries[curve.parameters()]
+        for comb in cached_fixed_base_tables(curve):
+            if any(saved["point"] == comb.point.affine for saved in entry["tables"]):
+                continue
+            entry["tables"].append({"point": comb.point.affine})
+    with open(path, "w") as f:
+        json.dump({
+            "fields": [[order, *parameters] for order, parameters in galois_field_parameters.items()],
+            "curves": list(entries.values()),
+        }, f)
+
+
+# Read a file written by save_registry, curves created afterwards (and those already registered) start from it
+def load_registry(path):
+    with open(path) as f:
+        data = json.load(f)
+    for order, irreducible_poly, primitive_element in data["fields"]:
+        add_galois_field_parameters(order, irreducible_poly, primitive_element)
+    for entry in data["curves"]:
+        _persisted[tuple(entry["parameters"])] = entry
+    for curve in _curves.values():
+        _restore(curve)
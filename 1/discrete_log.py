@@ -0,0 +1,212 @@
+from elliptic_curve import *
+from number_theory import factorint
+from array import array
+from math import gcd, isqrt
+import random
+
+# Default number of baby steps kept in memory by bsgs. BabyStepTable has 2 to 4 slots of 16 bytes per baby step,
+# at this cap 4 slots, 64 bytes per baby step (64 MiB)
+BSGS_MEMORY_CAP = 1 << 20
+# Keys are the affine x-coordinate truncated to 63 bits
+_KEY_MASK = (1 << 63) - 1
+
+
+# Preallocated open addressing table from truncated x-coordinates to baby step indices. Different x-coordinates
+# can share a truncated key, so every baby step is stored and lookup returns all of them
+class BabyStepTable:
+
+    def __init__(self, capacity: int):
+        size = 1 << (2 * capacity).bit_length()
+        self.mask = size - 1
+        # key + 1 is stored so 0 marks an empty slot
+        self.keys = array("Q", bytes(8 * size))
+        self.values = array("Q", bytes(8 * size))
+
+    def insert(self, x: int, value: int):
+        key = (x & _KEY_MASK) + 1
+        slot = key & self.mask
+        while self.keys[slot] != 0:
+            slot = (slot + 1) & self.mask
+        self.keys[slot] = key
+        self.values[slot] = value
+
+    # all values stored under the truncated key of x, the caller has to verify them
+    def lookup(self, x: int):
+        key = (x & _KEY_MASK) + 1
+        slot = key & self.mask
+        while self.keys[slot] != 0:
+            if self.keys[slot] == key:
+                yield self.values[slot]
+            slot = (slot + 1) & self.mask
+
+
+def _affine_x(points):
+    curve = points[0].curve
+    return [None if point.is_infinity else point.affine[0] for point in curve.batch_to_affine(points)]
+
+
+# Baby step giant step, the k in [0, bound) with kP = Q or None.
+# At most memory_cap baby steps jP, 0 <= j <= m, are stored. Since -jP has the same x-coordinate
+# every giant step Q - i(2m+1)P covers 2m+1 candidates for k
+def bsgs(P: EllipticPoint, Q: EllipticPoint, bound: int, memory_cap: int=BSGS_MEMORY_CAP):
+    if Q.is_infinity:
+        return 0
+    m = max(1, min(isqrt(bound) // 2 + 1, memory_cap))
+    table = BabyStepTable(m + 1)
+    current = P
+    for start in range(1, m + 1, AFFINE_BATCH_SIZE):
+        batch = []
+        for _ in range(start, min(start + AFFINE_BATCH_SIZE, m + 1)):
+            batch.append(current)
+            current = current + P
+        for j, x in enumerate(_affine_x(batch), start):
+            if x is not None:
+                table.insert(x, j)
+
+    stride = 2 * m + 1
+    giant = -P.multiply(stride)
+    current = Q
+    i = 0
+    while i * stride < bound + m:
+        batch = []
+        for _ in range(AFFINE_BATCH_SIZE):
+            batch.append(current)
+            current = current + giant
+        for offset, x in enumerate(_affine_x(batch)):
+            base = (i + offset) * stride
+            if x is None:
+                if base < bound:
+                    return base
+                continue
+            for j in table.lookup(x):
+                for k in (base + j, base - j):
+                    if 0 <= k < bound and P.multiply(k) == Q:
+                        return k
+        i += AFFINE_BATCH_SIZE
+    return None
+
+
+# All k in [0, n) with d k = c mod n
+def _solve_linear(d: int, c: int, n: int):
+    g = gcd(d, n)
+    if c % g != 0:
+        return []
+    k = (c // g) * pow(d // g, -1, n // g) % (n // g) if n // g > 1 else 0
+    return [k + t * (n // g) for t in range(g)]
+
+
+# Distinguished point bits that keep about a thousand distinguished points whatever the size of n
+def default_dp_bits(n: int) -> int:
+    return max(0, isqrt(n).bit_length() - 10)
+
+
+# Iterations after which rho gives up, far beyond the expected sqrt(pi n / 2)
+def default_max_steps(n: int, dp_bits: int) -> int:
+    return 100 * isqrt(n) + (100 << dp_bits)
+
+
+# Pollard rho with an r-adding walk W -> W + M_j, M_j = a_j P + b_j Q, j chosen from the x-coordinate of W.
+# Walks stop at distinguished points, those with dp_bits low zero bits in x, and only those are stored.
+# n is the order of P, returns k with kP = Q or None after max_steps steps.
+# If a stats dict is given the number of iterations and distinguished points are recorded in it
+def pollard_rho(P: EllipticPoint, Q: EllipticPoint, n: int, dp_bits: int=None, partitions: int=20, max_steps: int=None, stats: dict=None):
+    if Q.is_infinity:
+        return 0
+    if n < 16:
+        return bsgs(P, Q, n)
+    if dp_bits is None:
+        dp_bits = default_dp_bits(n)
+    if max_steps is None:
+        max_steps = default_max_steps(n, dp_bits)
+    walk = RhoWalk(P, Q, n, partitions)
+    distinguished = {}
+    steps = 0
+    k = None
+    while steps < max_steps and k is None:
+        x, a, b, length = walk.run(dp_bits, 20 << dp_bits)
+        steps += length
+        if x is None:
+            continue
+        if x in distinguished:
+            k = walk.solve(a, b, *distinguished[x])
+        distinguished[x] = (a, b)
+    if stats is not None:
+        stats["iterations"] = steps
+        stats["distinguished"] = len(distinguished)
+    return k
+
+
+# One r-adding walk configuration, shared by every walk that should be able to collide with the others
+class RhoWalk:
+
+    def __init__(self, P: EllipticPoint, Q: EllipticPoint, n: int, partitions: int=20, steps=None):
+        self.P = P
+        self.Q = Q
+        self.n = n
+        if steps is None:
+            steps = [(random.randrange(n), random.randrange(n)) for _ in range(partitions)]
+        self.steps = steps
+        self.moves = P.curve.batch_to_affine([P.multiply(a) + Q.multiply(b) for a, b in steps])
+
+    # Walk from a random aP + bQ to the next distinguished point, (x, a, b, length) or x = None if the walk
+    # hit the point at infinity or ran longer than max_length
+    def run(self, dp_bits: int, max_length: int):
+        n = self.n
+        dp_mask = (1 << dp_bits) - 1
+        partitions = len(self.moves)
+        a, b = random.randrange(n), random.randrange(n)
+        W = self.P.multiply(a) + self.Q.multiply(b)
+        for length in range(1, max_length + 1):
+            if W.is_infinity:
+                return None, a, b, length
+            x = W.affine[0]
+            if x & dp_mask == 0:
+                return x, a, b, length
+            j = x % partitions
+            W = W + self.moves[j]
+            a = (a + self.steps[j][0]) % n
+            b = (b + self.steps[j][1]) % n
+        return None, a, b, max_length
+
+    # k with kP = Q from two walks ending in the same x-coordinate, aP + bQ = ±(a2 P + b2 Q)
+    def solve(self, a: int, b: int, a2: int, b2: int):
+        n = self.n
+        for sign in (1, -1):
+            d = (sign * b2 - b) % n
+            if d == 0:
+                continue
+            for k in _solve_linear(d, (a - sign * a2) % n, n):
+                if self.P.multiply(k) == self.Q:
+                    return k
+        return None
+
+
+# Pohlig-Hellman, the discrete log k of Q to base P modulo the order n of P, solving every prime power
+# subgroup with method "bsgs", "rho" or "auto" (bsgs for small prime factors, rho otherwise)
+def discrete_log(P: EllipticPoint, Q: EllipticPoint, n: int=None, method: str="auto", memory_cap: int=BSGS_MEMORY_CAP):
+    if n is None:
+        n = P.get_order()
+    if method not in ("auto", "bsgs", "rho"):
+        raise ValueError(f"Unknown discrete log method {method}")
+    k = 0
+    modulus = 1
+    for q, e in factorint(n).items():
+        P_q = P.multiply(n // q**e)
+        Q_q = Q.multiply(n // q**e)
+        gamma = P_q.multiply(q**(e - 1))
+        k_q = 0
+        for i in range(e):
+            H = (Q_q - P_q.multiply(k_q)).multiply(q**(e - 1 - i))
+            if method == "bsgs" or (method == "auto" and isqrt(q) // 2 + 1 <= memory_cap):
+                d = bsgs(gamma, H, q, memory_cap)
+            else:
+                d = pollard_rho(gamma, H, q)
+            if d is None:
+                raise ValueError("Q is not a multiple of P")
+            k_q += d * q**i
+        # Chinese remainder theorem
+        k += modulus * ((k_q - k) * pow(modulus, -1, q**e) % q**e)
+        modulus *= q**e
+    if P.multiply(k) != Q:
+        raise ValueError("Q is not a multiple of P")
+    return k
@@ -1,22 +1,86 @@
 from elliptic_curve import *
+from scalar_mult import FixedBaseComb, SCALAR_METHODS
+
+# Fixed-base tables for G and the public keys used with encrypt are kept per curve object, in
+# curve._fixed_base_tables keyed by the affine coordinates of the point, so the points they return are bound to
+# that curve and its scalar method and validation policy
+FIXED_BASE_CACHE_SIZE = 64
+# Multiplications by a public key before it gets a fixed-base table, a key used once doesn't pay for the precomputation
+FIXED_BASE_MIN_USES = 2
+
+
+def fixed_base_table(point: EllipticPoint) -> FixedBaseComb:
+    table = point.curve._fixed_base_tables.get(point.affine)
+    if table is None:
+        table = cache_fixed_base_table(FixedBaseComb(point, point.curve.field_size.bit_length()))
+    return table
+
+
+def cache_fixed_base_table(table: FixedBaseComb) -> FixedBaseComb:
+    tables = table.point.curve._fixed_base_tables
+    if len(tables) >= FIXED_BASE_CACHE_SIZE:
+        del tables[next(iter(tables))]
+    tables[table.point.affine] = table
+    return table
+
+
+# A function multiplying the public key by a scalar, with its fixed-base table once the key has been used for
+# FIXED_BASE_MIN_USES multiplications (counting these uses) and with the scalar method of the curve before that.
+# The uses are counted in curve._fixed_base_uses, which is bounded like the tables
+def public_key_multiplier(public_key: EllipticPoint, uses: int=1):
+    curve = public_key.curve
+    table = curve._fixed_base_tables.get(public_key.affine)
+    if table is not None:
+        return table.multiply
+    counts = curve._fixed_base_uses
+    count = counts.pop(public_key.affine, 0) + uses
+    if count >= FIXED_BASE_MIN_USES:
+        return fixed_base_table(public_key).multiply
+    if len(counts) >= FIXED_BASE_CACHE_SIZE:
+        del counts[next(iter(counts))]
+    counts[public_key.affine] = count
+    return public_key.multiply
+
+
+def cached_fixed_base_tables(curve: EllipticCurve):
+    return list(curve._fixed_base_tables.values())
+
+
+# The point on the given curve object, for points of an equal curve created separately (e.g. with another scalar
+# method or validation policy), so tables and results are bound to the curve the caller asked for
+def _on_curve(curve: EllipticCurve, point: EllipticPoint) -> EllipticPoint:
+    if point.curve is curve:
+        return point
+    if point.curve != curve:
+        raise ValueError("Curve doesn't match with the curve of the points")
+    return EllipticPoint._from_jacobian(curve, point.x, point.y, point.z)
 
 
 class ElGamal:
 
-    def __init__(self, curve: EllipticCurve, G: EllipticPoint=None, private_key: int=None, public_key: EllipticPoint=None):
+    # scalar_method selects how the private key is multiplied, one of SCALAR_METHODS or None for the fixed-base table
+    # on key generation and the default method of the curve on decryption. "ladder" does the same work for every
+    # key bit so the timing of key generation and decryption doesn't depend on the private key
+    def __init__(self, curve: EllipticCurve, G: EllipticPoint=None, private_key: int=None, public_key: EllipticPoint=None, scalar_method: str=None):
+        if scalar_method is not None and scalar_method not in SCALAR_METHODS:
+            raise ValueError(f"Unknown scalar multiplication method {scalar_method}")
+        self.scalar_method = scalar_method
         self.curve = curve
         if G is None:
             self.G = curve.random_point()
         else:
-            self.G = G
+            self.G = _on_curve(curve, G)
+        self.G_table = fixed_base_table(self.G)
         if private_key is  None:
             self.private_key = curve.random_scalar()
         else:
             self.private_key = private_key
-        if public_key is None:
-            self.public_key = self.G * self.private_key
+        if public_key is None and scalar_method is not None:
+            self.public_key = self.G.multiply(self.private_key, scalar_method)
+        elif public_key is None:
+            self.public_key = self.G_table.multiply(self.private_key)
         else:
-            self.public_key = public_key
+            self.public_key = _on_curve(curve, public_key)
 
     def get_point(self):
         return self.G
@@ -28,15 +92,50 @@ class ElGamal:
         return self.public_key
     
     def decrypt(self, c1: EllipticPoint, c2: EllipticPoint):
-        return c2 - c1 * self.private_key
+        self.curve.check_input(c1)
+        self.curve.check_input(c2)
+        return c2 - c1.multiply(self.private_key, self.scalar_method or self.curve.scalar_method)
+
+    # Decrypt a sequence of (c1, c2) pairs, the message points are returned in affine form (z = 1)
+    def decrypt_many(self, ciphertexts):
+        return self.curve.batch_to_affine([self.decrypt(c1, c2) for c1, c2 in ciphertexts])
 
 def encrypt(curve: EllipticCurve, public_key: EllipticPoint, G: EllipticPoint, message: EllipticPoint):
     if message.curve != curve or public_key.curve != curve or G.curve != curve:
         raise ValueError("Curve doesn't match with the curve of the points")
     r = curve.random_scalar()
-    c1 = G * r
-    c2 = message + public_key * r
+    c1 = fixed_base_table(_on_curve(curve, G)).multiply(r)
+    c2 = _on_curve(curve, message) + public_key_multiplier(_on_curve(curve, public_key))(r)
     return (c1, c2)
 
-    
 
+# Encrypt a sequence of message points, the (c1, c2) pairs are returned in affine form (z = 1)
+# normalized together with a single field inversion for the whole batch
+def encrypt_many(curve: EllipticCurve, public_key: EllipticPoint, G: EllipticPoint, messages):
+    if public_key.curve != curve or G.curve != curve:
+        raise ValueError("Curve doesn't match with the curve of the points")
+    messages = list(messages)
+    G_table = fixed_base_table(_on_curve(curve, G))
+    public_key_multiply = public_key_multiplier(_on_curve(curve, public_key), len(messages))
+    points = []
+    for message in messages:
+        if message.curve != curve:
+            raise ValueError("Curve doesn't match with the curve of the points")
+        r = curve.random_scalar()
+        points.append(G_table.multiply(r))
+        points.append(_on_curve(curve, message) + public_key_multiply(r))
+    points = curve.batch_to_affine(points)
+    return list(zip(points[0::2], points[1::2]))
+
+
+# Encrypt a sequence of message points with whole-array operations on PointBatches instead of a loop per message,
+# the (c1, c2) pairs are returned in affine form (z = 1)
+def encrypt_batch(curve: EllipticCurve, public_key: EllipticPoint, G: EllipticPoint, messages):
+    from point_batch import PointBatch
+    if public_key.curve != curve or G.curve != curve:
+        raise ValueError("Curve doesn't match with the curve of the points")
+    messages = PointBatch.from_points(curve, messages)
+    r = [curve.random_scalar() for _ in range(len(messages))]
+    c1 = PointBatch.repeat(G, len(messages)).multiply(r)
+    c2 = messages + PointBatch.repeat(public_key, len(messages)).multiply(r)
+    return list(zip(c1.to_points(), c2.to_points()))
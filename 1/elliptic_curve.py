@@ -1,52 +1,148 @@
-import galois
-from sympy import primefactors
-from sympy.ntheory import legendre_symbol
+from number_theory import prime_power_base, factorint
+from backends import PrimeFieldBackend, GaloisFieldBackend
+from scalar_mult import SCALAR_METHODS
+from schoof import count_points
+from math import isqrt
+from itertools import islice
 import random
 
+VALIDATION_MODES = ("always", "inputs", "never")
+# Points are normalized to affine in batches of this size so they share one inversion, used by iter_multiples,
+# the baby steps of bsgs and the ciphertext file writer
+AFFINE_BATCH_SIZE = 256
+
 class EllipticCurve:
-    def __init__(self, a:int, b:int, p: int, n: int):
+    # backend is "int" for native integer arithmetic (prime fields only), "galois" for galois FieldArrays
+    # or None to pick "int" automatically when the field is a prime field.
+    # scalar_method is the default algorithm for point multiplication, one of SCALAR_METHODS.
+    # validation is the on-curve check policy, one of VALIDATION_MODES:
+    #   "always" checks every point including the results of the arithmetic, for debugging
+    #   "inputs" checks only externally supplied points, internal arithmetic runs unchecked
+    #   "never" checks nothing unless asked for explicitly with check=True
+    def __init__(self, a:int, b:int, p: int, n: int, backend: str=None, scalar_method: str="wnaf", validation: str="inputs"):
         self.field_size = p ** n
-        if len(primefactors(p)) > 1:
+        characteristic = prime_power_base(p) if p > 1 else None
+        if p > 1 and characteristic is None:
             raise ValueError("The field size must only have one prime factor!")
         if p <= 1 or n <= 0 or (p == 2 and n <= 1) :
             raise ValueError("The field must be of a larger degree than 2")
-        self.F = galois.GF(self.field_size)
+        is_prime_field = n == 1 and characteristic == p
+        if backend is None:
+            backend = "int" if is_prime_field else "galois"
+        if backend == "int":
+            if not is_prime_field:
+                raise ValueError("The int backend only supports prime fields")
+            self.backend = PrimeFieldBackend(p, a, b)
+        elif backend == "galois":
+            self.backend = GaloisFieldBackend(p, n, a, b)
+        else:
+            raise ValueError(f"Unknown backend {backend}")
+        self.backend_name = backend
+        if scalar_method not in SCALAR_METHODS:
+            raise ValueError(f"Unknown scalar multiplication method {scalar_method}")
+        self.scalar_method = scalar_method
+        if validation not in VALIDATION_MODES:
+            raise ValueError(f"Unknown validation mode {validation}")
+        self.validation = validation
+        self.check_arithmetic = validation == "always"
+        self.F = self.backend.element
         self.p = p
         self.n = n
+        self.characteristic = characteristic
         self.a = self.F(a)
         self.b = self.F(b)
         self._0 = self.F(0)
         self._1 = self.F(1)
-        self._2 = self.F(2 % p)
-        self._3 = self.F(3 % p)
-        self._4 = self.F(4 % p)
-        self._8 = self.F(8 % p)
-        self._2mulinverse = self.F(1) / self.F(2)
+        self._2mulinverse = self.backend.inv2
+        # the point at infinity, shared by all arithmetic on the curve
+        self.infinity = EllipticPoint(self, 0, 1, 0, check=False)
+        self._order = None
+        self._order_factors = None
+        # fixed-base comb tables of points on this curve and the uses of public keys without one yet, managed by
+        # el_gamal.fixed_base_table and el_gamal.public_key_multiplier
+        self._fixed_base_tables = {}
+        self._fixed_base_uses = {}
      
+    # plain integer parameters (a, b, p, n) the curve can be rebuilt from, e.g. in another process
+    def parameters(self):
+        return (int(self.a), int(self.b), self.p, self.n)
+
     # check y^2=x^3+axz^4+bz^6 over field F
     def is_projective_point_on_curve(self, x, y, z) -> bool:
-        return (((y**2) == (x**3) + (self.a * x * z**4 )+ (self.b * z**6))
+        return (self.backend.is_on_curve(x, y, z)
                 or (x == self._0 and y == self._1 and z == self._0)) # point at infinity
         
+    # Number of points on the curve including the point at infinity, computed once.
+    # Prime fields use Schoof's algorithm. Over GF(c^k) a curve with a and b in the prime field GF(c) has
+    # #E = c^k + 1 - s_k with s_0 = 2, s_1 = t the trace over GF(c) and s_k = t s_(k-1) - c s_(k-2),
+    # other curves over extension fields count the points over every x, see _order_is_fast
+    def order(self) -> int:
+        if self._order is None:
+            if self.field_size == self.characteristic:
+                self._order = count_points(int(self.a), int(self.b), self.p)
+            elif self._defined_over_prime_field():
+                c = self.characteristic
+                t = c + 1 - count_points(int(self.a), int(self.b), c)
+                s_prev, s = 2, t
+                size = c
+                while size < self.field_size:
+                    s_prev, s = s, t * s - c * s_prev
+                    size *= c
+                self._order = self.field_size + 1 - s
+            else:
+                # squaring is a bijection in characteristic 2, so every x has exactly one y
+                points_per_square = 1 if self.characteristic == 2 else 2
+                order = 1
+                for x in range(self.field_size):
+                    x = self.F(x)
+                    rhs = self.F(x**3 + self.a * x + self.b)
+                    if rhs == self._0:
+                        order += 1
+                    elif self.backend.is_square(rhs):
+                        order += points_per_square
+                self._order = order
+        return self._order
+
+    # a and b lie in the prime field and the curve is nonsingular there, so the trace recurrence of order applies.
+    # The short Weierstrass form is always singular in characteristic 2
+    def _defined_over_prime_field(self) -> bool:
+        c = self.characteristic
+        a, b = int(self.a), int(self.b)
+        return c > 2 and a < c and b < c and (4 * a ** 3 + 27 * b ** 2) % c != 0
+
+    # order() is known or doesn't need a pass over the whole field
+    def _order_is_fast(self) -> bool:
+        return self._order is not None or self.field_size == self.characteristic or self._defined_over_prime_field()
+
+    # prime factorization {q: e} of the curve order
+    def order_factors(self):
+        if self._order_factors is None:
+            self._order_factors = factorint(self.order())
+        return self._order_factors
+
+    # validate an externally supplied point according to the validation policy
+    def check_input(self, point):
+        if self.validation != "never" and not self.is_projective_point_on_curve(point.x, point.y, point.z):
+            raise ValueError(f"Point {point} is not on the curve")
+
     def __eq__(self, other) -> bool:
         if isinstance(other, EllipticCurve):
-            return self.F == other.F and self.a == other.a and self.b == other.b
+            # points of curves on different backends can't be mixed in the arithmetic
+            return (self.backend_name == other.backend_name and self.field_size == other.field_size
+                    and self.a == other.a and self.b == other.b)
         else:
             return False
         
     def __str__(self) -> str:
-        return f"y^2 = x^3 + {str(self.a)}xz^4 + {str(self.b)}z^6 over {str(self.F.properties)}"
+        return f"y^2 = x^3 + {str(self.a)}xz^4 + {str(self.b)}z^6 over {self.backend.properties}"
     
     def random_point(self):
         while True:
             x = self.F(random.randint(0, self.field_size-1))
             # z = 1
-            rhs =  x**3 + self.a * x + self.b
-            if self.p == 2 or legendre_symbol(rhs, self.p) == 1:
-                for y in range(self.field_size):
-                    y = self.F(y)
-                    if y**2 == rhs:
-                        return EllipticPoint(self, x, y, 1, check=False)
+            rhs = self.F(x**3 + self.a * x + self.b)
+            if self.backend.is_square(rhs):
+                return EllipticPoint(self, x, self.backend.sqrt(rhs), 1, check=False)
     
     def random_scalar(self):
         return random.randint(1, self.field_size-1)
@@ -57,25 +153,74 @@ class EllipticCurve:
             raise ValueError("Number is too large for the field")
         x = self.F(number)
         # z = 1
-        rhs =  x**3 + self.a * x + self.b
-        if self.p == 2 or legendre_symbol(rhs, self.p) == 1:
-            for y in range(self.field_size):
-                y = self.F(y)
-                if y**2 == rhs:
-                    return EllipticPoint(self, x, y, 1, check=False)
+        rhs = self.F(x**3 + self.a * x + self.b)
+        if self.backend.is_square(rhs):
+            return EllipticPoint(self, x, self.backend.sqrt(rhs), 1, check=False)
         raise ValueError("No point found for this number")
     
+    # Normalize points to z = 1 sharing a single field inversion, the point at infinity is kept as is
+    def batch_to_affine(self, points):
+        finite = [i for i, point in enumerate(points) if not point.is_infinity]
+        z_invs = self.backend.batch_inv([points[i].z for i in finite])
+        result = list(points)
+        mul = self.backend.mul
+        for i, z_inv in zip(finite, z_invs):
+            z_inv_2 = mul(z_inv, z_inv)
+            result[i] = EllipticPoint._from_jacobian(self, mul(points[i].x, z_inv_2), mul(mul(points[i].y, z_inv_2), z_inv), self._1)
+        return result
+
+    # Bytes per field element in point encodings
+    @property
+    def element_size(self) -> int:
+        return (self.field_size.bit_length() + 7) // 8
+
+    # The bit that tells y from -y in compressed encodings, the parity of y for prime fields as in SEC1 and
+    # for extension fields whether y is the larger of the two in integer representation
+    def _y_bit(self, y) -> int:
+        if self.n == 1:
+            return int(y) & 1
+        y = self.F(y)
+        return int(int(y) > int(-y))
+
+    # SEC1 point decoding, 0x00 for the point at infinity, 0x04 || x || y uncompressed or 0x02 / 0x03 || x compressed
+    def point_from_bytes(self, data):
+        size = self.element_size
+        if len(data) == 1 and data[0] == 0:
+            return self.infinity
+        if len(data) == 1 + 2 * size and data[0] == 4:
+            x = int.from_bytes(data[1:1 + size], "big")
+            y = int.from_bytes(data[1 + size:], "big")
+            if x >= self.field_size or y >= self.field_size:
+                raise ValueError("Point coordinates are too large for the field")
+            return EllipticPoint(self, x, y, 1)
+        if len(data) == 1 + size and data[0] in (2, 3):
+            x = int.from_bytes(data[1:], "big")
+            if x >= self.field_size:
+                raise ValueError("Point coordinates are too large for the field")
+            x = self.F(x)
+            y = self.backend.sqrt(self.F(x**3 + self.a * x + self.b))
+            if y is None:
+                raise ValueError("No point on the curve has this x-coordinate")
+            if self._y_bit(y) != data[0] & 1:
+                y = self.F(-y)
+            return EllipticPoint(self, x, y, 1, check=False)
+        raise ValueError("Invalid point encoding")
+
     def map_from_point(self, point):
         if isinstance(point, EllipticPoint):
-            return point.x / point.z_2
+            return self.backend.to_affine(point.x, point.y, point.z)[0]
         else:
             raise ValueError("Can only map points")
 
 
 class EllipticPoint:
+    __slots__ = ("curve", "x", "y", "z", "_odd_multiples", "_ladder_shift", "_affine", "_hash")
 
-    def __init__(self, curve: EllipticCurve, x: int, y: int, z:int=1, check=True):
+    # check=None validates the point unless the validation policy of the curve is "never"
+    def __init__(self, curve: EllipticCurve, x: int, y: int, z:int=1, check=None):
         self.curve = curve
+        if check is None:
+            check = curve.validation != "never"
         if check:
             if curve.F(z) == curve._0 and (curve.F(x) != curve._0 and curve.F(y) != curve._1):
                 raise ValueError("z can't be zero")
@@ -84,93 +229,114 @@ class EllipticPoint:
         self.x = curve.F(x)
         self.y = curve.F(y)
         self.z = curve.F(z)
-        self.z_2 = self.z**2
-        self.z_3 = self.z_2*self.z
+        self._odd_multiples = None
+        self._ladder_shift = None
+        self._affine = None
+        self._hash = None
+
+    # build a point from coordinates that are already field elements, without conversions or checks
+    @classmethod
+    def _from_jacobian(cls, curve: EllipticCurve, x, y, z):
+        point = cls.__new__(cls)
+        point.curve = curve
+        point.x = x
+        point.y = y
+        point.z = z
+        point._odd_multiples = None
+        point._ladder_shift = None
+        point._affine = None
+        point._hash = None
+        return point
+
+    @property
+    def z_2(self):
+        return self.curve.backend.mul(self.z, self.z)
+
+    @property
+    def z_3(self):
+        return self.curve.backend.mul(self.z_2, self.z)
     
+    @property
+    def is_infinity(self) -> bool:
+        return self.z == self.curve._0
+
+    # The affine coordinates as a tuple of ints, None for the point at infinity. Points never change after
+    # construction, so the inversion is done once and the result kept for hashing, equality and printing
+    @property
+    def affine(self):
+        if self._affine is None and not self.is_infinity:
+            x, y = self.curve.backend.to_affine(self.x, self.y, self.z)
+            self._affine = (int(x), int(y))
+        return self._affine
+
     def __add__(self, other):
         if isinstance(other, EllipticPoint):
-            if self.curve != other.curve:
+            if self.curve is not other.curve and self.curve != other.curve:
                 raise ValueError("Can't add points on different curves")
-            if self == other:
-                return self.double()
-            if self == EllipticPoint(self.curve, 0, 1, 0):
+            if self.is_infinity:
                 return other
-            if other == EllipticPoint(self.curve, 0, 1, 0):
+            if other.is_infinity:
                 return self
-            lambda1 = self.x * other.z_2
-            lambda2 = other.x * self.z_2
-            lambda3 = lambda1 - lambda2
-            lambda4 = self.y * other.z_3
-            lambda5 = other.y * self.z_3
-            lambda6 = lambda4 - lambda5
-            lambda7 = lambda1 + lambda2
-            lambda8 = lambda4 + lambda5
-            z3 = self.z * other.z * lambda3
-            lambda3_2 = lambda3**2
-            x3 = lambda6**2 - lambda7 * lambda3_2
-            lambda9 = lambda7 * lambda3_2 - self.curve._2 * x3
-            y3 = (lambda9 * lambda6 - lambda8 * lambda3*lambda3_2) * self.curve._2mulinverse
+            result = self.curve.backend.add(self, other)
+            if result is None:
+                return self.double()
+            x3, y3, z3 = result
             if z3 == self.curve._0:
-                return EllipticPoint(
-                    self.curve,
-                    0,
-                    1,
-                    0
-                )
+                return self.curve.infinity
+            elif self.curve.check_arithmetic:
+                return EllipticPoint(self.curve, x3, y3, z3, check=True)
             else:
-                return EllipticPoint(
-                    self.curve,
-                    x3,
-                    y3,
-                    z3,
-                    check=True
-                )
+                return EllipticPoint._from_jacobian(self.curve, x3, y3, z3)
         else:
             raise ValueError("Can't add point to non-point")
     
     def double(self):
-        if self == EllipticPoint(self.curve, 0, 1, 0):
+        if self.is_infinity:
             return self
-        lambda1 = self.curve._3 * self.x**2 + self.curve.a * self.z_3*self.z
-        z3 = self.curve._2 * self.y * self.z
-        y_2 = self.y**2
-        lambda2 = self.curve._4 * self.x * y_2
-        x3 = lambda1**2 - self.curve._2 * lambda2
-        lambda3 = self.curve._8 * y_2**2
-        y3 = lambda1 * (lambda2 - x3) - lambda3
+        x3, y3, z3 = self.curve.backend.double(self)
         if z3 == self.curve._0:
-            return EllipticPoint(
-                self.curve,
-                0,
-                1,
-                0
-            )
+            return self.curve.infinity
+        elif self.curve.check_arithmetic:
+            return EllipticPoint(self.curve, x3, y3, z3, check=True)
         else:
-            return EllipticPoint(
-                self.curve,
-                x3,
-                y3,
-                z3,
-                check=True
-            )
+            return EllipticPoint._from_jacobian(self.curve, x3, y3, z3)
         
-    # set max order to limit the group size, or None to get the full group
+    # set max order to limit the group size, or None to get the full group ending with the point at infinity
     def get_cyclic_group(self, max_order=None):
-        group = [self]
-        past = set()
-        current = self
-        while max_order is None or len(group) < max_order:
-            past.add(current)
-            current = current + self
-            if current in past:
-                break
-            group.append(current)
-        return group
-    
+        return list(self.iter_multiples(limit=max_order))
+
+    # Lazily yield [start]P, [start + step]P, [start + 2 step]P, ... at most limit points, stopping after the
+    # point at infinity. affine=True yields (x, y) int tuples instead, (None, None) for the point at infinity
+    def iter_multiples(self, start: int=1, step: int=1, limit: int=None, affine: bool=False):
+        multiples = self._multiples(start, step, limit)
+        if not affine:
+            yield from multiples
+            return
+        while True:
+            batch = list(islice(multiples, AFFINE_BATCH_SIZE))
+            if not batch:
+                return
+            for point in self.curve.batch_to_affine(batch):
+                yield (None, None) if point.is_infinity else (int(point.x), int(point.y))
+
+    def _multiples(self, start: int, step: int, limit: int):
+        current = self.multiply(start)
+        increment = self.multiply(step)
+        if not increment.is_infinity:
+            increment = self.curve.batch_to_affine([increment])[0]
+        count = 0
+        while limit is None or count < limit:
+            yield current
+            count += 1
+            # a zero increment would repeat the same point forever
+            if current.is_infinity or increment.is_infinity:
+                return
+            current = current + increment
+
     # Naive algorithm to get the order of the point, very slow for big fields
     def get_order_naive(self):
         i = 2
-        point_at_infinity = EllipticPoint(self.curve, 0, 1, 0)
+        point_at_infinity = self.curve.infinity
         current = self
         while True:
             current = current + self
@@ -178,66 +344,91 @@ class EllipticPoint:
                 return i
             i += 1 
     
-    # Baby step giant step algorithm
+    # The order divides the curve order N, strip every prime factor q from N while [N/q]P is still the identity.
+    # When N would take a pass over the whole field the order is found with get_order_bsgs instead
     def get_order(self):
-        # Upperlimit for the order of the curve
-        n = int((self.curve.field_size + self.curve.field_size**0.5) ** 0.5)+1
-
-        small_steps = {EllipticPoint(self.curve, 0,1,0): 0}
-        k = self
-        for i in range(1, n):
-            if small_steps.__contains__(k) == False:
-                small_steps[k] = i
-            else:
-                return i
-            k += self
-    
-        big_step = (-self)*n
-        current = big_step
-        for i in range(1, n):
-            if current in small_steps:
-                return n*i + small_steps[current]
-            current += big_step
-    
-    def __mul__(self, n: int):
+        if not self.curve._order_is_fast():
+            return self.get_order_bsgs()
+        return self.order_from_multiple(self.curve.order(), self.curve.order_factors())
+
+    # The order of the point from any multiple M with [M]P = O, factors is the factorization of M if known
+    def order_from_multiple(self, multiple: int, factors=None):
+        if factors is None:
+            factors = factorint(multiple)
+        order = multiple
+        for q in factors:
+            while order % q == 0 and self.multiply(order // q).is_infinity:
+                order //= q
+        return order
+
+    # Baby step giant step over the Hasse interval q + 1 - 2 sqrt(q) <= M <= q + 1 + 2 sqrt(q) for a multiple M
+    # of the order, memory_cap bounds the number of stored baby steps
+    def get_order_bsgs(self, memory_cap: int=None):
+        from discrete_log import bsgs, BSGS_MEMORY_CAP
+        if self.is_infinity:
+            return 1
+        width = isqrt(4 * self.curve.field_size) + 1
+        low = max(self.curve.field_size + 1 - width, 1)
+        k = bsgs(self, -self.multiply(low), 2 * width + 1, memory_cap or BSGS_MEMORY_CAP)
+        return self.order_from_multiple(low + k)
+
+    # method is one of SCALAR_METHODS, defaults to the method of the curve
+    def multiply(self, n: int, method: str=None, width: int=None):
         if n == 0:
-            return EllipticPoint(self.curve, 0, 1, 0)
+            return self.curve.infinity
         if n < 0:
-            return (-self) * (-n)
+            return (-self).multiply(-n, method, width)
         if n == 1:
             return self
-        if n % 2 == 0:
-            return (self.double()) * (n // 2)
-        else:
-            return (self.double()) * (n // 2) + self
+        if method is None:
+            method = self.curve.scalar_method
+        if method not in SCALAR_METHODS:
+            raise ValueError(f"Unknown scalar multiplication method {method}")
+        return SCALAR_METHODS[method](self, n, width)
+
+    def __mul__(self, n: int):
+        return self.multiply(n)
         
     def __rmul__(self, n: int):
         return self * n
     
     def __neg__(self):
-        if self.z == self.curve._0:
+        if self.is_infinity:
             return self
         else:
-            return EllipticPoint(self.curve, self.x, (-self.y), self.z, check=False)
+            return EllipticPoint._from_jacobian(self.curve, self.x, self.curve.F(-self.y), self.z)
     
     def __sub__(self, other):
         return self + (-other)
     
+    # SEC1 point encoding, see EllipticCurve.point_from_bytes
+    def to_bytes(self, compressed: bool=True) -> bytes:
+        if self.is_infinity:
+            return b"\x00"
+        x, y = self.affine
+        size = self.curve.element_size
+        if compressed:
+            return bytes([2 | self.curve._y_bit(y)]) + x.to_bytes(size, "big")
+        return b"\x04" + x.to_bytes(size, "big") + y.to_bytes(size, "big")
+
     def __str__(self) -> str:
-        if self.z == self.curve._0:
+        if self.is_infinity:
             return f"Point at infinity in {str(self.curve)}" 
         else:
-            return f"({str(self.x / self.z_2)}, {str(self.y / self.z_3)}) in {str(self.curve)}"
+            nx, ny = self.affine
+            return f"({str(nx)}, {str(ny)}) in {str(self.curve)}"
     
     def __hash__(self) -> int:
-        if self.z == 0:
-            return hash(('infinity'))
-        nx = self.x / self.z_2
-        ny = self.y / self.z_3
-        return hash((str(nx), str(ny)))
-
-    def __eq__(self, other: EllipticCurve) -> bool:
-        if self.z == self.curve._0 or other.z == other.curve._0:
-            return self.z == other.z
-        else:
-            return (self.x / self.z_2 == other.x / other.z_2) and (self.y / self.z_3 == other.y / other.z_3)
+        if self._hash is None:
+            self._hash = hash(('infinity')) if self.is_infinity else hash(self.affine)
+        return self._hash
+
+    # compares x1 z2^2 = x2 z1^2 and y1 z2^3 = y2 z1^3, no inversions needed
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, EllipticPoint):
+            return False
+        if self.is_infinity or other.is_infinity:
+            return self.is_infinity and other.is_infinity
+        if self._affine is not None and other._affine is not None:
+            return self._affine == other._affine
+        return self.curve.backend.equal(self, other)
@@ -0,0 +1,63 @@
+from el_gamal import *
+
+# Koblitz style message encoding. A number m is mapped to the first x = m * 2^k + j, 0 <= j < 2^k,
+# for which x^3 + ax + b is a square, so every number below field_size / 2^k can be encoded,
+# failing only with probability about 2^-(2^k)
+
+
+def koblitz_encode(curve: EllipticCurve, number: int, k: int=8) -> EllipticPoint:
+    if number < 0 or (number + 1) << k > curve.field_size:
+        raise ValueError("Number is too large for the field")
+    for j in range(1 << k):
+        x = curve.F((number << k) + j)
+        y = curve.backend.sqrt(curve.F(x**3 + curve.a * x + curve.b))
+        if y is not None:
+            return EllipticPoint(curve, x, y, 1, check=False)
+    raise ValueError("No point found for this number")
+
+
+def koblitz_decode(curve: EllipticCurve, point: EllipticPoint, k: int=8) -> int:
+    return int(curve.map_from_point(point)) >> k
+
+
+# The number of payload bytes that fit in one point, one bit is used as a length sentinel
+def bytes_per_point(curve: EllipticCurve, k: int=8) -> int:
+    size = (curve.field_size.bit_length() - 2 - k) // 8
+    if size < 1:
+        raise ValueError("The field is too small to encode bytes with this padding")
+    return size
+
+
+# Read chunks of size bytes from a binary file object or a bytes-like object
+def iter_chunks(data, size: int):
+    if hasattr(data, "read"):
+        while True:
+            chunk = data.read(size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        view = memoryview(data)
+        for i in range(0, len(view), size):
+            yield bytes(view[i:i + size])
+
+
+# Lazily encode a byte stream into points, the chunk is prefixed with a 1 bit so leading zero bytes survive
+def encode_stream(curve: EllipticCurve, data, k: int=8):
+    for chunk in iter_chunks(data, bytes_per_point(curve, k)):
+        yield koblitz_encode(curve, (1 << (8 * len(chunk))) | int.from_bytes(chunk, "big"), k)
+
+
+def decode_stream(curve: EllipticCurve, points, k: int=8):
+    for point in points:
+        number = koblitz_decode(curve, point, k)
+        yield (number ^ (1 << (number.bit_length() - 1))).to_bytes((number.bit_length() - 1) // 8, "big")
+
+
+def encrypt_stream(curve: EllipticCurve, public_key: EllipticPoint, G: EllipticPoint, data, k: int=8):
+    for message in encode_stream(curve, data, k):
+        yield encrypt(curve, public_key, G, message)
+
+
+def decrypt_stream(elgamal: ElGamal, ciphertexts, k: int=8):
+    return decode_stream(elgamal.curve, (elgamal.decrypt(c1, c2) for c1, c2 in ciphertexts), k)
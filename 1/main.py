@@ -1,8 +1,13 @@
 from elliptic_curve import *
 from el_gamal import *
+from discrete_log import discrete_log
+from curve_registry import get_curve, save_registry, load_registry, clear_registry
+import json
+import os
+import tempfile
 
 def test_elliptic():
-    curve = EllipticCurve(1, 1, 1000003, 1)
+    curve = get_curve(1, 1, 1000003, 1)
     p1 = curve.random_point()
     p2 = curve.random_point()
     while p1 == p2:
@@ -18,7 +23,7 @@ def test_elliptic():
 
 
 def test_elgamal():
-    curve = EllipticCurve(1, 1, 1000003, 1)
+    curve = get_curve(1, 1, 1000003, 1)
     elgamal = ElGamal(curve, G=EllipticPoint(curve, 613420, 643318, 1))
     G = elgamal.get_point()
     public_key = elgamal.get_public_key()
@@ -44,6 +49,56 @@ def test_elgamal():
     print(f"Decrypted: {decrypted}")
 
 
+def test_discrete_log():
+    curve = get_curve(1, 1, 1000003, 1)
+    elgamal = ElGamal(curve, G=EllipticPoint(curve, 613420, 643318, 1))
+    G = elgamal.get_point()
+    order = G.get_order()
+    print(f"Order of G: {order}")
+    private_key = discrete_log(G, elgamal.get_public_key(), order)
+    print(f"Recovered private key: {private_key}")
+    print(f"Private key mod order: {elgamal.get_private_key() % order}")
+
+
+def test_registry():
+    curve = get_curve(1, 1, 1000003, 1)
+    G = EllipticPoint(curve, 613420, 643318, 1)
+    order = G.get_order()
+    fixed_base_table(G)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "registry.json")
+        save_registry(path)
+        with open(path) as f:
+            saved = json.load(f)
+
+        # an unfactored order with the right product is dropped and recomputed
+        tampered = json.loads(json.dumps(saved))
+        tampered["curves"][0]["order_factors"] = {str(curve.order() * 10): 1}
+        tampered["curves"][0]["order"] = curve.order() * 10
+        with open(path, "w") as f:
+            json.dump(tampered, f)
+        clear_registry()
+        load_registry(path)
+        restored = get_curve(1, 1, 1000003, 1)
+        print(f"Tampered order restored: {restored._order is not None}")
+        print(f"Order of G after tampered order: {EllipticPoint(restored, 613420, 643318, 1).get_order()} (expected {order})")
+
+        # a table point off the curve is dropped, the curve can still be created
+        tampered = json.loads(json.dumps(saved))
+        tampered["curves"][0]["tables"].append({"point": [1, 2]})
+        with open(path, "w") as f:
+            json.dump(tampered, f)
+        clear_registry()
+        load_registry(path)
+        restored = get_curve(1, 1, 1000003, 1)
+        restored_again = get_curve(1, 1, 1000003, 1, validation="never")
+        print(f"Tables restored with a tampered point: {len(restored._fixed_base_tables)}, "
+              f"for another curve object: {len(restored_again._fixed_base_tables)} (expected {len(saved['curves'][0]['tables'])})")
+    clear_registry()
+
+
 if __name__ == "__main__":
     test_elliptic()
     test_elgamal()
+    test_discrete_log()
+    test_registry()
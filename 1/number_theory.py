@@ -0,0 +1,121 @@
+from math import isqrt, gcd
+import sys
+
+# Integer helpers needed on every curve construction, kept free of sympy so prime field workflows never import it
+
+# Miller-Rabin with these bases is deterministic below 3.3 * 10^24, larger numbers get the same test as a strong
+# probable prime test
+_WITNESSES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+
+def is_prime(n: int) -> bool:
+    if n < 2:
+        return False
+    for q in _WITNESSES:
+        if n % q == 0:
+            return n == q
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for a in _WITNESSES:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+# floor(n^(1/k)) by integer Newton iteration, starting above the root so the iterates decrease to it
+def _integer_root(n: int, k: int) -> int:
+    if k == 2:
+        return isqrt(n)
+    root = 1 << -(-n.bit_length() // k)
+    while True:
+        next_root = ((k - 1) * root + n // root ** (k - 1)) // k
+        if next_root >= root:
+            return root
+        root = next_root
+
+
+# The prime q with n = q^k for some k >= 1, or None if n isn't a prime power
+def prime_power_base(n: int):
+    if is_prime(n):
+        return n
+    for k in range(2, n.bit_length() + 1):
+        root = _integer_root(n, k)
+        if root < 2:
+            break
+        if root ** k == n and is_prime(root):
+            return root
+    return None
+
+
+# Primes below this bound are divided out before Pollard-Brent takes over
+_TRIAL_DIVISION_BOUND = 1000
+
+
+# A nontrivial factor of the odd composite n with Brent's variant of Pollard rho, gcds are taken over batches of
+# m steps and the batch is replayed one step at a time when it overshoots to n
+def _pollard_brent(n: int) -> int:
+    c = 1
+    m = 128
+    while True:
+        y, r, q = 2, 1, 1
+        f = lambda v: (v * v + c) % n
+        g = 1
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = f(y)
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for _ in range(min(m, r - k)):
+                    y = f(y)
+                    q = q * abs(x - y) % n
+                g = gcd(q, n)
+                k += m
+            r *= 2
+        if g == n:
+            g = 1
+            while g == 1:
+                ys = f(ys)
+                g = gcd(abs(x - ys), n)
+        if g != n:
+            return g
+        c += 1
+
+
+# Prime factorization {q: e} of n with trial division and Pollard-Brent. sympy is only used as a speedup when the
+# program has loaded it already, so factoring a curve order never imports it
+def factorint(n: int):
+    sympy = sys.modules.get("sympy")
+    if sympy is not None:
+        return sympy.factorint(n)
+    factors = {}
+    for q in range(2, _TRIAL_DIVISION_BOUND):
+        if q * q > n:
+            break
+        while n % q == 0:
+            factors[q] = factors.get(q, 0) + 1
+            n //= q
+    pending = [n] if n > 1 else []
+    while pending:
+        m = pending.pop()
+        if is_prime(m):
+            factors[m] = factors.get(m, 0) + 1
+            continue
+        root = isqrt(m)
+        if root * root == m:
+            pending += [root, root]
+            continue
+        d = _pollard_brent(m)
+        pending += [d, m // d]
+    return dict(sorted(factors.items()))
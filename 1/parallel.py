@@ -0,0 +1,134 @@
+from el_gamal import *
+from discrete_log import RhoWalk, default_dp_bits, default_max_steps
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+import os
+import random
+
+# Per process state of a pool worker, set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(parameters, backend: str, scalar_method: str, validation: str, G, public_key):
+    curve = EllipticCurve(*parameters, backend=backend, scalar_method=scalar_method, validation=validation)
+    _worker["curve"] = curve
+    _worker["G"] = EllipticPoint(curve, *G, 1)
+    _worker["public_key"] = EllipticPoint(curve, *public_key, 1)
+    # build the fixed-base tables once per worker instead of once per task
+    fixed_base_table(_worker["G"])
+    fixed_base_table(_worker["public_key"])
+
+
+def _encrypt_chunk(messages):
+    curve = _worker["curve"]
+    points = [EllipticPoint(curve, x, y, 1, check=False) if x is not None else curve.infinity for x, y in messages]
+    ciphertexts = encrypt_many(curve, _worker["public_key"], _worker["G"], points)
+    return [(to_coordinates(c1), to_coordinates(c2)) for c1, c2 in ciphertexts]
+
+
+# Compact picklable form of a point, its affine integer coordinates or (None, None) for the point at infinity
+def to_coordinates(point: EllipticPoint):
+    if point.is_infinity:
+        return (None, None)
+    return point.affine
+
+
+def from_coordinates(curve: EllipticCurve, coordinates) -> EllipticPoint:
+    x, y = coordinates
+    if x is None:
+        return curve.infinity
+    return EllipticPoint(curve, x, y, 1, check=False)
+
+
+def _chunks(iterable, chunk_size: int):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Encrypt a stream of message points on a process pool, yields the (c1, c2) pairs in the order of the messages.
+# Messages are sent to the workers in chunks of chunk_size and at most 2 * workers chunks are in flight at once,
+# so the message stream is consumed lazily
+def encrypt_parallel(curve: EllipticCurve, public_key: EllipticPoint, G: EllipticPoint, messages, workers: int=None, chunk_size: int=256):
+    if public_key.curve != curve or G.curve != curve:
+        raise ValueError("Curve doesn't match with the curve of the points")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    initargs = (curve.parameters(), curve.backend_name, curve.scalar_method, curve.validation, to_coordinates(G), to_coordinates(public_key))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+        pending = deque()
+        for chunk in _chunks(messages, chunk_size):
+            for message in chunk:
+                if message.curve != curve:
+                    raise ValueError("Curve doesn't match with the curve of the points")
+            pending.append(executor.submit(_encrypt_chunk, [to_coordinates(message) for message in chunk]))
+            if len(pending) >= 2 * workers:
+                for c1, c2 in pending.popleft().result():
+                    yield (from_coordinates(curve, c1), from_coordinates(curve, c2))
+        while pending:
+            for c1, c2 in pending.popleft().result():
+                yield (from_coordinates(curve, c1), from_coordinates(curve, c2))
+
+
+def _init_rho_worker(parameters, backend: str, P, Q, n: int, steps, dp_bits: int):
+    # forked workers inherit the random state of the parent, every worker needs its own walks
+    random.seed()
+    curve = EllipticCurve(*parameters, backend=backend)
+    _worker["walk"] = RhoWalk(from_coordinates(curve, P), from_coordinates(curve, Q), n, steps=steps)
+    _worker["dp_bits"] = dp_bits
+
+
+# Run walks until task_steps iterations are done, returns the distinguished points (x, a, b) and the iterations
+def _rho_task(task_steps: int):
+    walk = _worker["walk"]
+    dp_bits = _worker["dp_bits"]
+    found = []
+    iterations = 0
+    while iterations < task_steps:
+        x, a, b, length = walk.run(dp_bits, 20 << dp_bits)
+        iterations += length
+        if x is not None:
+            found.append((x, a, b))
+    return found, iterations
+
+
+# Parallel Pollard rho (van Oorschot-Wiener). Every worker process runs independent walks with the same
+# r-adding walk configuration and reports the distinguished points it reaches, the coordinator keeps them and
+# solves for k with kP = Q on the first collision. n is the order of P, returns k or None after max_steps
+# iterations. If a stats dict is given the number of iterations and distinguished points are recorded in it
+def parallel_rho(P: EllipticPoint, Q: EllipticPoint, n: int, workers: int=None, dp_bits: int=None, partitions: int=20, max_steps: int=None, stats: dict=None):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if dp_bits is None:
+        dp_bits = default_dp_bits(n)
+    if max_steps is None:
+        max_steps = default_max_steps(n, dp_bits)
+    curve = P.curve
+    walk = RhoWalk(P, Q, n, partitions)
+    task_steps = 16 << dp_bits
+    initargs = (curve.parameters(), curve.backend_name, to_coordinates(P), to_coordinates(Q), n, walk.steps, dp_bits)
+    distinguished = {}
+    iterations = 0
+    k = None
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_rho_worker, initargs=initargs) as executor:
+        pending = {executor.submit(_rho_task, task_steps) for _ in range(2 * workers)}
+        while pending and k is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                found, length = future.result()
+                iterations += length
+                for x, a, b in found:
+                    if k is None and x in distinguished:
+                        k = walk.solve(a, b, *distinguished[x])
+                    distinguished[x] = (a, b)
+                if k is None and iterations < max_steps:
+                    pending.add(executor.submit(_rho_task, task_steps))
+        executor.shutdown(wait=True, cancel_futures=True)
+    if stats is not None:
+        stats["iterations"] = iterations
+        stats["distinguished"] = len(distinguished)
+    return k
@@ -0,0 +1,153 @@
+from elliptic_curve import *
+import numpy as np
+
+
+# N points of one curve in Jacobian coordinates, stored as arrays X, Y and Z with the point at infinity as (0, 1, 0).
+# The arithmetic runs elementwise over the whole batch through the array operations of the curve backend,
+# the special cases (infinity, P == Q, P == -Q) are handled with masks instead of branches
+class PointBatch:
+
+    def __init__(self, curve: EllipticCurve, X, Y, Z):
+        self.curve = curve
+        self.X = X
+        self.Y = Y
+        self.Z = Z
+
+    @classmethod
+    def from_points(cls, curve: EllipticCurve, points):
+        points = list(points)
+        for point in points:
+            if point.curve != curve:
+                raise ValueError("Curve doesn't match with the curve of the points")
+        array = curve.backend.array
+        return cls(curve, array([point.x for point in points]), array([point.y for point in points]), array([point.z for point in points]))
+
+    # count copies of one point
+    @classmethod
+    def repeat(cls, point: EllipticPoint, count: int):
+        array = point.curve.backend.array
+        return cls(point.curve, array([point.x] * count), array([point.y] * count), array([point.z] * count))
+
+    @classmethod
+    def infinity(cls, curve: EllipticCurve, count: int):
+        return cls.repeat(curve.infinity, count)
+
+    def __len__(self) -> int:
+        return len(self.X)
+
+    def __getitem__(self, i: int) -> EllipticPoint:
+        F = self.curve.F
+        return EllipticPoint._from_jacobian(self.curve, F(self.X[i]), F(self.Y[i]), F(self.Z[i]))
+
+    # The points as EllipticPoints normalized to z = 1 with a single field inversion
+    def to_points(self):
+        return self.curve.batch_to_affine([self[i] for i in range(len(self))])
+
+    @property
+    def is_infinity(self):
+        return self.curve.backend.array_is_zero(self.Z)
+
+    # Mask of the points that satisfy y^2 = x^3 + axz^4 + bz^6 or are the point at infinity
+    def is_on_curve(self):
+        backend = self.curve.backend
+        mul, is_zero = backend.array_mul, backend.array_is_zero
+        z_2 = mul(self.Z, self.Z)
+        z_4 = mul(z_2, z_2)
+        rhs = backend.array_add(mul(mul(self.X, self.X), self.X), backend.array_scale(mul(self.X, z_4), self.curve.a))
+        rhs = backend.array_add(rhs, backend.array_scale(mul(z_4, z_2), self.curve.b))
+        on_curve = is_zero(backend.array_sub(mul(self.Y, self.Y), rhs))
+        infinity = is_zero(self.X) & is_zero(backend.array_sub(self.Y, backend.array([1]))) & is_zero(self.Z)
+        return on_curve | infinity
+
+    # other where mask is set, self elsewhere
+    def select(self, mask, other):
+        where = self.curve.backend.array_where
+        return PointBatch(self.curve, where(mask, other.X, self.X), where(mask, other.Y, self.Y), where(mask, other.Z, self.Z))
+
+    # replace every result with z = 0 by the canonical point at infinity
+    def _normalize_infinity(self):
+        mask = self.is_infinity
+        if mask.any():
+            return self.select(mask, PointBatch.infinity(self.curve, len(self)))
+        return self
+
+    def __neg__(self):
+        return PointBatch(self.curve, self.X, self.curve.backend.array_neg(self.Y), self.Z)
+
+    def double(self):
+        backend = self.curve.backend
+        mul, add, sub, scale = backend.array_mul, backend.array_add, backend.array_sub, backend.array_scale
+        X1, Y1, Z1 = self.X, self.Y, self.Z
+        z1_2 = mul(Z1, Z1)
+        lambda1 = add(scale(mul(X1, X1), 3), scale(mul(z1_2, z1_2), self.curve.a))
+        Z3 = scale(mul(Y1, Z1), 2)
+        y_2 = mul(Y1, Y1)
+        lambda2 = scale(mul(X1, y_2), 4)
+        X3 = sub(mul(lambda1, lambda1), scale(lambda2, 2))
+        lambda3 = scale(mul(y_2, y_2), 8)
+        Y3 = sub(mul(lambda1, sub(lambda2, X3)), lambda3)
+        return PointBatch(self.curve, X3, Y3, Z3)._normalize_infinity()
+
+    def __add__(self, other):
+        if not isinstance(other, PointBatch):
+            raise ValueError("Can't add point batch to non-point batch")
+        if self.curve is not other.curve and self.curve != other.curve:
+            raise ValueError("Can't add points on different curves")
+        if len(self) != len(other):
+            raise ValueError("Point batches must have the same length")
+        backend = self.curve.backend
+        mul, add, sub, scale, is_zero = backend.array_mul, backend.array_add, backend.array_sub, backend.array_scale, backend.array_is_zero
+        X1, Y1, Z1 = self.X, self.Y, self.Z
+        X2, Y2, Z2 = other.X, other.Y, other.Z
+        z1_2 = mul(Z1, Z1)
+        z2_2 = mul(Z2, Z2)
+        lambda1 = mul(X1, z2_2)
+        lambda2 = mul(X2, z1_2)
+        lambda4 = mul(Y1, mul(z2_2, Z2))
+        lambda5 = mul(Y2, mul(z1_2, Z1))
+        lambda3 = sub(lambda1, lambda2)
+        lambda6 = sub(lambda4, lambda5)
+        lambda7 = add(lambda1, lambda2)
+        lambda8 = add(lambda4, lambda5)
+        Z3 = mul(mul(Z1, Z2), lambda3)
+        lambda3_2 = mul(lambda3, lambda3)
+        lambda7_3_2 = mul(lambda7, lambda3_2)
+        X3 = sub(mul(lambda6, lambda6), lambda7_3_2)
+        lambda9 = sub(lambda7_3_2, scale(X3, 2))
+        Y3 = scale(sub(mul(lambda9, lambda6), mul(lambda8, mul(lambda3, lambda3_2))), self.curve._2mulinverse)
+        result = PointBatch(self.curve, X3, Y3, Z3)._normalize_infinity()
+        self_infinity = self.is_infinity
+        other_infinity = other.is_infinity
+        same = is_zero(lambda3) & is_zero(lambda6) & ~self_infinity & ~other_infinity
+        if same.any():
+            result = result.select(same, self.double())
+        return result.select(other_infinity, self).select(self_infinity, other)
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    # Elementwise [k_i]P_i by left to right double and add over the bits of all scalars at once.
+    # scalars is a sequence of ints with one scalar per point, or a single int for all of them
+    def multiply(self, scalars):
+        if isinstance(scalars, int):
+            scalars = [scalars] * len(self)
+        if len(scalars) != len(self):
+            raise ValueError("There must be one scalar per point")
+        negative = np.array([k < 0 for k in scalars], dtype=bool)
+        base = self.select(negative, -self) if negative.any() else self
+        scalars = [abs(k) for k in scalars]
+        size = (max(scalars, default=0).bit_length() + 7) // 8
+        # row i holds the bits of scalar i, most significant first
+        bits = np.unpackbits(np.frombuffer(b"".join(k.to_bytes(size, "big") for k in scalars), dtype=np.uint8).reshape(len(self), size), axis=1).astype(bool)
+        result = PointBatch.infinity(self.curve, len(self))
+        for column in bits.T:
+            result = result.double()
+            if column.any():
+                result = result.select(column, result + base)
+        return result
+
+    def __mul__(self, scalars):
+        return self.multiply(scalars)
+
+    def __rmul__(self, scalars):
+        return self * scalars
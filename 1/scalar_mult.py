@@ -0,0 +1,198 @@
+# Iterative scalar multiplication engines for EllipticPoint, all take n >= 1
+
+
+# Window width that balances the table size against the number of additions for a bits long scalar
+def window_width(bits: int) -> int:
+    if bits < 24:
+        return 3
+    if bits < 80:
+        return 4
+    if bits < 240:
+        return 5
+    return 6
+
+
+# Let the point keep its tables (odd multiples and ladder correction) between multiplications, for bases multiplied
+# many times such as the generator of an ElGamal instance or the point of a fixed-base comb. Other points build their
+# tables for each multiplication and drop them afterwards, so the c1 of every decrypted ciphertext doesn't keep a
+# table alive
+def keep_tables(point):
+    if point._odd_multiples is None:
+        point._odd_multiples = [point]
+    return point
+
+
+# The odd multiples [P, 3P, 5P, ...] of the point, at least count of them.
+# The table is cached on points opted in with keep_tables so repeated multiplications of the same base reuse it,
+# and normalized to z = 1 so additions with its entries take the mixed addition path
+def odd_multiples(point, count: int):
+    table = point._odd_multiples
+    if table is None:
+        table = [point]
+    if len(table) < count:
+        twice = point.double()
+        while len(table) < count:
+            table.append(table[-1] + twice)
+        table[:] = point.curve.batch_to_affine(table)
+    return table
+
+
+# Left to right binary method
+def double_and_add(point, n: int, width: int=None):
+    result = point
+    for bit in bin(n)[3:]:
+        result = result.double()
+        if bit == "1":
+            result = result + point
+    return result
+
+
+# Left to right sliding window over the binary expansion using odd multiples up to (2^width - 1)P
+def sliding_window(point, n: int, width: int=None):
+    bits = bin(n)[2:]
+    if width is None:
+        width = window_width(len(bits))
+    table = odd_multiples(point, 1 << (width - 1))
+    result = None
+    i = 0
+    while i < len(bits):
+        if bits[i] == "0":
+            result = result.double()
+            i += 1
+            continue
+        j = min(i + width, len(bits))
+        while bits[j - 1] == "0":
+            j -= 1
+        value = int(bits[i:j], 2)
+        if result is None:
+            result = table[value >> 1]
+        else:
+            for _ in range(j - i):
+                result = result.double()
+            result = result + table[value >> 1]
+        i = j
+    return result
+
+
+# Width-w non adjacent form, least significant digit first. Every non-zero digit is odd and |d| < 2^(width-1)
+def wnaf_digits(n: int, width: int):
+    digits = []
+    modulus = 1 << width
+    half = 1 << (width - 1)
+    while n > 0:
+        if n & 1:
+            digit = n & (modulus - 1)
+            if digit >= half:
+                digit -= modulus
+            n -= digit
+        else:
+            digit = 0
+        digits.append(digit)
+        n >>= 1
+    return digits
+
+
+# Left to right wNAF method using odd multiples up to (2^(width-1) - 1)P
+def wnaf(point, n: int, width: int=None):
+    if width is None:
+        width = window_width(n.bit_length())
+    digits = wnaf_digits(n, width)
+    table = odd_multiples(point, 1 << (width - 2))
+    result = table[digits[-1] >> 1]
+    for digit in reversed(digits[:-1]):
+        result = result.double()
+        if digit > 0:
+            result = result + table[digit >> 1]
+        elif digit < 0:
+            result = result - table[(-digit) >> 1]
+    return result
+
+
+# Montgomery ladder with co-Z addition, every bit costs one co-Z add-subtract and one co-Z addition whatever its
+# value. The scalar is padded to n + 2^L with L the bit length of the field size so the number of iterations doesn't
+# depend on n either, 2^L P is subtracted again at the end. An intermediate multiple that is the point at infinity
+# breaks the co-Z formulas (z becomes 0), which can only happen for points of small order; those fall back to wNAF
+def montgomery_ladder(point, n: int, width: int=None):
+    if point.is_infinity:
+        return point
+    curve = point.curve
+    backend = curve.backend
+    bits = max(curve.field_size.bit_length(), n.bit_length())
+    k = n + (1 << bits)
+    x, y = backend.to_affine(point.x, point.y, point.z)
+    R1, R0, z = backend.cz_double(x, y)
+    R = [R0, R1]
+    for i in range(bits - 1, -1, -1):
+        b = (k >> i) & 1
+        R[1 - b], R[b], dz = backend.cz_add_sub(R[b], R[1 - b])
+        z = backend.mul(z, dz)
+        R[b], R[1 - b], dz = backend.cz_add(R[1 - b], R[b])
+        z = backend.mul(z, dz)
+    if z == curve._0:
+        return wnaf(point, n)
+    return type(point)._from_jacobian(curve, R[0][0], R[0][1], z) - ladder_shift(point, bits)
+
+
+# The correction 2^bits P of the ladder, cached next to the odd multiples on points opted in with keep_tables so it
+# is only computed once per such base. The scalar length is fixed by the field size, so bits only changes for
+# oversized scalars
+def ladder_shift(point, bits: int):
+    cached = point._ladder_shift
+    if cached is None or cached[0] != bits:
+        shift = point
+        for _ in range(bits):
+            shift = shift.double()
+        cached = (bits, shift)
+        if point._odd_multiples is not None:
+            point._ladder_shift = cached
+    return cached[1]
+
+
+SCALAR_METHODS = {
+    "double_and_add": double_and_add,
+    "sliding_window": sliding_window,
+    "wnaf": wnaf,
+    "ladder": montgomery_ladder,
+}
+
+
+# Fixed-base comb (Lim-Lee) for scalars below 2^bits. The scalar bits are split into width rows of d columns,
+# table[idx] holds the sum of 2^(j*d)P over the set bits j of idx so a multiplication costs d doublings and d additions
+class FixedBaseComb:
+
+    def __init__(self, point, bits: int, width: int=None):
+        if width is None:
+            width = window_width(bits) + 1
+        # scalars longer than bits fall back to the point's own multiplication
+        self.point = keep_tables(point)
+        self.bits = bits
+        self.width = width
+        self.columns = -(-bits // width)
+        self.table = [None] * (1 << width)
+        base = point
+        for j in range(width):
+            if j > 0:
+                for _ in range(self.columns):
+                    base = base.double()
+            self.table[1 << j] = base
+            for idx in range(1, 1 << j):
+                self.table[idx | (1 << j)] = self.table[idx] + base
+        self.table[1:] = point.curve.batch_to_affine(self.table[1:])
+
+    def multiply(self, n: int):
+        if n < 0:
+            return -self.multiply(-n)
+        if n.bit_length() > self.bits:
+            return self.point.multiply(n)
+        result = None
+        for i in range(self.columns - 1, -1, -1):
+            if result is not None:
+                result = result.double()
+            idx = 0
+            for j in range(self.width):
+                idx |= ((n >> (i + j * self.columns)) & 1) << j
+            if idx:
+                result = self.table[idx] if result is None else result + self.table[idx]
+        if result is None:
+            return self.point.multiply(0)
+        return result
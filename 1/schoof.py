@@ -0,0 +1,264 @@
+# Schoof's algorithm for the number of points on y^2 = x^3 + ax + b over a prime field GF(p).
+# Polynomials are lists of int coefficients in [0, p), lowest degree first, without trailing zeros
+
+# Below this size the points are simply counted with Euler's criterion
+NAIVE_LIMIT = 1 << 10
+
+
+def _trim(a):
+    while a and a[-1] == 0:
+        a.pop()
+    return a
+
+
+def _add(a, b, p):
+    if len(a) < len(b):
+        a, b = b, a
+    result = list(a)
+    for i, c in enumerate(b):
+        result[i] = (result[i] + c) % p
+    return _trim(result)
+
+
+def _sub(a, b, p):
+    return _add(a, [(-c) % p for c in b], p)
+
+
+def _scale(a, c, p):
+    return _trim([c * ai % p for ai in a])
+
+
+# Kronecker substitution, the polynomials are packed into big ints so the product is a single int multiplication
+def _mul(a, b, p):
+    if not a or not b:
+        return []
+    digits = (2 * p.bit_length() + min(len(a), len(b)).bit_length() + 4) // 4
+    fmt = f"0{digits}x"
+    A = int("".join(format(c, fmt) for c in reversed(a)), 16)
+    B = int("".join(format(c, fmt) for c in reversed(b)), 16)
+    size = len(a) + len(b) - 1
+    product = format(A * B, "x").rjust(size * digits, "0")
+    return _trim([int(product[i:i + digits], 16) % p for i in range(size * digits - digits, -1, -digits)])
+
+
+def _divmod(a, b, p):
+    a = list(a)
+    inv = pow(b[-1], -1, p)
+    q = [0] * max(len(a) - len(b) + 1, 0)
+    for i in range(len(a) - len(b), -1, -1):
+        c = a[i + len(b) - 1] * inv % p
+        q[i] = c
+        if c:
+            for j, bj in enumerate(b):
+                a[i + j] = (a[i + j] - c * bj) % p
+    return _trim(q), _trim(a[:len(b) - 1])
+
+
+def _monic(a, p):
+    return _scale(a, pow(a[-1], -1, p), p)
+
+
+def _gcd(a, b, p):
+    while b:
+        a, b = b, _divmod(a, b, p)[1]
+    return _monic(a, p) if a else a
+
+
+# Raised when a polynomial is not invertible modulo h, carries the non-trivial factor gcd(a, h) of h
+class _Factor(Exception):
+    def __init__(self, factor):
+        self.factor = factor
+
+
+# Arithmetic in GF(p)[x] / h with Barrett reduction through a precomputed power series inverse of reversed h
+class _PolyMod:
+
+    def __init__(self, h, p: int):
+        self.p = p
+        self.h = _monic(h, p)
+        self.n = len(self.h) - 1
+        self.h_rev_inv = self._series_inverse(self.h[::-1], max(self.n - 1, 1))
+
+    def _series_inverse(self, f, precision: int):
+        p = self.p
+        g = [pow(f[0], -1, p)]
+        k = 1
+        while k < precision:
+            k = min(2 * k, precision)
+            fg = _mul(f[:k], g, p)[:k]
+            correction = _sub([2], fg, p)
+            g = _mul(g, correction, p)[:k]
+        return _trim(g)
+
+    def reduce(self, a):
+        n = self.n
+        m = len(a) - 1
+        if m < n:
+            return a
+        if m > 2 * n - 2:
+            return _divmod(a, self.h, self.p)[1]
+        k = m - n + 1
+        q_rev = _mul(a[::-1][:k], self.h_rev_inv[:k], self.p)[:k]
+        q = _trim((q_rev + [0] * (k - len(q_rev)))[::-1])
+        return _sub(a[:n], _mul(q, self.h, self.p)[:n], self.p)
+
+    def mul(self, a, b):
+        return self.reduce(_mul(a, b, self.p))
+
+    def pow(self, a, e: int):
+        result = [1]
+        base = self.reduce(a)
+        for bit in bin(e)[2:]:
+            result = self.mul(result, result)
+            if bit == "1":
+                result = self.mul(result, base)
+        return result
+
+    def inverse(self, a):
+        p = self.p
+        r0, r1 = self.h, self.reduce(a)
+        s0, s1 = [], [1]
+        while r1:
+            q, r = _divmod(r0, r1, p)
+            r0, r1 = r1, r
+            s0, s1 = s1, _sub(s0, _mul(q, s1, p), p)
+        if len(r0) != 1:
+            raise _Factor(_monic(r0, p))
+        return self.reduce(_scale(s0, pow(r0[0], -1, p), p))
+
+
+# Division polynomials with y eliminated, psi_n = g_n for odd n and psi_n = y g_n for even n, y^2 = f.
+# ring is a _PolyMod to compute them reduced, or None for the exact polynomials
+class _DivisionPolynomials:
+
+    def __init__(self, a: int, b: int, p: int, ring=None):
+        self.p = p
+        self.ring = ring
+        self.f = self._reduce([b % p, a % p, 0, 1])
+        self.f_2 = self._mul(self.f, self.f)
+        inv2 = pow(2, -1, p)
+        self.inv2 = inv2
+        self.g = {
+            0: [],
+            1: [1],
+            2: [2 % p],
+            3: self._reduce(_trim([(-a * a) % p, 12 * b % p, 6 * a % p, 0, 3 % p])),
+            4: self._reduce(_trim([4 * x % p for x in [-8 * b * b - a ** 3, -4 * a * b, -5 * a * a, 20 * b, 5 * a, 0, 1]])),
+        }
+
+    def _reduce(self, a):
+        return _trim(a) if self.ring is None else self.ring.reduce(_trim(a))
+
+    def _mul(self, a, b):
+        return _mul(a, b, self.p) if self.ring is None else self.ring.mul(a, b)
+
+    def __getitem__(self, n: int):
+        if n not in self.g:
+            p = self.p
+            m = n // 2
+            if n % 2 == 1:
+                left = self._mul(self[m + 2], self._mul(self[m], self._mul(self[m], self[m])))
+                right = self._mul(self[m - 1], self._mul(self[m + 1], self._mul(self[m + 1], self[m + 1])))
+                if m % 2 == 0:
+                    left = self._mul(left, self.f_2)
+                else:
+                    right = self._mul(right, self.f_2)
+                self.g[n] = _sub(left, right, p)
+            else:
+                left = self._mul(self[m + 2], self._mul(self[m - 1], self[m - 1]))
+                right = self._mul(self[m - 2], self._mul(self[m + 1], self[m + 1]))
+                self.g[n] = _scale(self._mul(self[m], _sub(left, right, p)), self.inv2, p)
+        return self.g[n]
+
+
+# [k](x, y) = (X(x), Y(x) y) in the ring, for 0 < k < l
+def _multiple(ring, psi, k: int):
+    p = ring.p
+    if k == 1:
+        return ring.reduce([0, 1]), [1]
+    g_k_2 = ring.mul(psi[k], psi[k])
+    g_k_4 = ring.mul(g_k_2, g_k_2)
+    numerator = ring.mul(psi[k - 1], psi[k + 1])
+    if k % 2 == 1:
+        numerator = ring.mul(numerator, psi.f)
+    else:
+        g_k_2 = ring.mul(g_k_2, psi.f)
+        g_k_4 = ring.mul(g_k_4, psi.f_2)
+    X = _sub(ring.reduce([0, 1]), ring.mul(numerator, ring.inverse(g_k_2)), p)
+    Y = ring.mul(psi[2 * k], ring.inverse(_scale(g_k_4, 2, p)))
+    return X, Y
+
+
+# The trace of Frobenius t mod l, from pi^2 + [p] = [t] pi on the l-torsion.
+# The computation runs modulo a factor h of the l-th division polynomial
+def _trace_mod_l(a: int, b: int, p: int, h, l: int) -> int:
+    ring = _PolyMod(h, p)
+    psi = _DivisionPolynomials(a, b, p, ring)
+    x_p = ring.pow([0, 1], p)
+    y_p = ring.pow(psi.f, (p - 1) // 2)
+    x_p2 = ring.pow(x_p, p)
+    y_p2 = ring.pow(psi.f, (p * p - 1) // 2)
+    p_l = p % l
+    X, Y = _multiple(ring, psi, p_l)
+    if x_p2 == X:
+        if y_p2 != Y:
+            # pi^2 = -[p], so [t] pi = O
+            return 0
+        QX, QY = _multiple(ring, psi, 2 * p_l % l)
+    else:
+        L = ring.mul(_sub(y_p2, Y, p), ring.inverse(_sub(x_p2, X, p)))
+        QX = _sub(_sub(ring.mul(ring.mul(L, L), psi.f), x_p2, p), X, p)
+        QY = _sub(ring.mul(L, _sub(x_p2, QX, p)), y_p2, p)
+    for tau in range(1, (l - 1) // 2 + 1):
+        X, Y = _multiple(ring, psi, tau)
+        if ring.pow(X, p) == QX:
+            return tau if ring.mul(ring.pow(Y, p), y_p) == QY else l - tau
+    raise ArithmeticError(f"No trace found modulo {l}")
+
+
+def _next_prime(n: int) -> int:
+    n += 1
+    while any(n % d == 0 for d in range(2, int(n ** 0.5) + 1)):
+        n += 1
+    return n
+
+
+def count_points_naive(a: int, b: int, p: int) -> int:
+    count = 1
+    for x in range(p):
+        rhs = (x * x * x + a * x + b) % p
+        if rhs == 0:
+            count += 1
+        elif pow(rhs, (p - 1) // 2, p) == 1:
+            count += 2
+    return count
+
+
+def count_points(a: int, b: int, p: int) -> int:
+    a %= p
+    b %= p
+    if p < NAIVE_LIMIT or (4 * a ** 3 + 27 * b ** 2) % p == 0:
+        return count_points_naive(a, b, p)
+    f = [b, a, 0, 1]
+    # t is even exactly when f has a root, i.e. a point of order 2 exists
+    x_p = _PolyMod(f, p).pow([0, 1], p)
+    t = 0 if len(_gcd(f, _sub(x_p, [0, 1], p), p)) > 1 else 1
+    modulus = 2
+    l = 2
+    while modulus * modulus <= 16 * p:
+        l = _next_prime(l)
+        if l == p:
+            continue
+        h = _DivisionPolynomials(a, b, p)[l]
+        while True:
+            try:
+                t_l = _trace_mod_l(a, b, p, h, l)
+                break
+            except _Factor as factor:
+                h = factor.factor
+        # Chinese remainder theorem
+        t += modulus * ((t_l - t) * pow(modulus, -1, l) % l)
+        modulus *= l
+    if t > modulus // 2:
+        t -= modulus
+    return p + 1 - t
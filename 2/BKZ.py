@@ -0,0 +1,132 @@
+from math import gcd
+from LLL import as_columns, integral_basis, scale_basis, lll_fp, _gram_schmidt_fp
+
+# Tours over the whole basis before BKZ stops even if the last tour still changed the basis (early abort)
+BKZ_MAX_TOURS = 8
+
+
+def BKZ(B, block_size=10, delta=0.99, pruning=False, max_tours=BKZ_MAX_TOURS, max_nodes=None):
+    """
+    Perform BKZ reduction on basis B: LLL reduction, then tours over the basis in which every block of block_size
+    consecutive vectors gets its shortest vector, found by Schnorr-Euchner enumeration, inserted at its front
+    B: Basis whose columns are basis vectors to be reduced
+    block_size: Block size beta, 2 gives an LLL reduced basis and larger blocks give shorter vectors at a higher cost
+    delta: Reduction parameter of the LLL reductions and the improvement a block needs before a vector is inserted
+    pruning: Use linear pruning in the enumeration, the search tree is much smaller but a shortest vector can be missed
+    max_tours: Maximum number of tours, BKZ stops earlier when a tour doesn't change the basis
+    max_nodes: Maximum number of enumeration nodes per block, or None to enumerate the whole (pruned) tree
+    """
+    if block_size < 2:
+        raise ValueError("block_size should be at least 2")
+    if not (0.25 < delta < 1):
+        raise ValueError("delta should be in (1/4, 1)")
+    columns, convert = as_columns(B)
+    basis, d = integral_basis(columns)
+    return convert(scale_basis(bkz(basis, block_size, delta, pruning, max_tours, max_nodes), d))
+
+
+def bkz(basis, block_size=10, delta=0.99, pruning=False, max_tours=BKZ_MAX_TOURS, max_nodes=None):
+    """
+    BKZ reduction of an integer basis
+    basis: list of integer basis vectors
+    Returns the reduced basis as a list of integer vectors
+    """
+    basis = lll_fp(basis, delta)
+    m = len(basis)
+    for _ in range(max_tours):
+        changed = False
+        Mu, Bn = _gram_schmidt_fp(basis)
+        for k in range(m - 1):
+            h = min(k + block_size, m)
+            x = enumerate_block(Mu, Bn, k, h, delta * Bn[k], pruning, max_nodes)
+            if x is None:
+                continue
+            _insert(basis, k, x)
+            basis = lll_fp(basis, delta)
+            Mu, Bn = _gram_schmidt_fp(basis)
+            changed = True
+        if not changed:
+            break
+    return basis
+
+
+def enumerate_block(Mu, Bn, k, h, radius, pruning=True, max_nodes=None):
+    """
+    Schnorr-Euchner enumeration of the shortest nonzero vector in the projected block k..h-1 of the basis
+    Mu: Gram-Schmidt coefficients of the basis
+    Bn: squared norms of the orthogonalized basis vectors
+    k: index of the first vector of the block
+    h: index after the last vector of the block
+    radius: squared norm the vector has to be shorter than
+    pruning: Bound the partial norm at depth t by t / n * radius (linear pruning) instead of radius
+    max_nodes: Maximum number of enumeration nodes, the shortest vector found so far is returned when it is reached
+    Returns the integer coefficients of the vector in the block, or None if there is no vector shorter than radius
+    """
+    n = h - k
+    x = [0] * n
+    best = None
+    R = radius
+    nodes = 0
+
+    def search(i, partial, top):
+        # Enumerate coordinate i with the coordinates above it fixed and partial their squared projected norm,
+        # returns False when the node limit is reached
+        nonlocal best, R, nodes
+        c = -sum(x[j] * Mu[k+j][k+i] for j in range(i + 1, n))
+        b = Bn[k+i]
+        x0 = round(c)
+        s = 1 if c >= x0 else -1
+        t = 0
+        while True:
+            if top:
+                # with all coordinates above zero only v or -v has to be considered
+                xi = t
+            elif t % 2:
+                xi = x0 + s * ((t + 1) // 2)
+            else:
+                xi = x0 - s * (t // 2)
+            t += 1
+            dist = partial + (xi - c)**2 * b
+            if dist >= (R * (n - i) / n if pruning else R):
+                # the candidates are visited in order of increasing distance to the center
+                return True
+            nodes += 1
+            if max_nodes is not None and nodes > max_nodes:
+                return False
+            x[i] = xi
+            if i == 0:
+                if dist > 0:
+                    best = x[:]
+                    R = dist
+            elif not search(i - 1, dist, top and xi == 0):
+                return False
+
+    search(n - 1, 0.0, True)
+    return best
+
+
+def _insert(basis, k, x):
+    """
+    Make the vector with coefficients x in the block starting at k the basis vector k, with unimodular operations
+    on the block: coefficients are reduced pairwise like in Euclid's algorithm until a single one is left
+    basis: list of integer basis vectors, updated in place
+    k: index of the first vector of the block
+    x: integer coefficients of the vector
+    """
+    g = 0
+    for xi in x:
+        g = gcd(g, xi)
+    x = [xi // g for xi in x]
+    while True:
+        nonzero = [i for i in range(len(x)) if x[i]]
+        if len(nonzero) == 1:
+            break
+        i = max(nonzero, key=lambda l: abs(x[l]))
+        j = min((l for l in nonzero if l != i), key=lambda l: abs(x[l]))
+        q = x[i] // x[j]
+        # x_i b_i + x_j b_j = (x_i - q x_j) b_i + x_j (b_j + q b_i)
+        x[i] -= q * x[j]
+        basis[k+j] = [a + q * b for a, b in zip(basis[k+j], basis[k+i])]
+    i = nonzero[0]
+    v = basis.pop(k + i)
+    basis.insert(k, v if x[i] == 1 else [-a for a in v])
@@ -1,35 +1,102 @@
-from sage.all import *
+from contextlib import nullcontext
+from decimal import Decimal, localcontext
+from fractions import Fraction
+from math import floor, isfinite, lcm, log2
+from time import perf_counter
+
+# Size reduction bound of the floating-point LLL, slightly above 1/2 so rounding errors can't make it loop
+FP_ETA = 0.51
+# Size reduction rounds for one vector before the floating-point precision is considered too low
+FP_SIZE_REDUCTION_ROUNDS = 64
+# Decimal digits at which the floating-point LLL gives up
+FP_MAX_PRECISION = 4096
+
+# A basis B is a matrix whose columns are the basis vectors, given as a list of rows (lists of ints or Fractions),
+# a 2-dimensional NumPy array or a Sage matrix. B, np.array(B) and matrix(B) are the same basis for any list of rows B.
+# Sage is only imported for Sage input and results are returned in the kind of the input
+
+
+def _number(x):
+    """
+    x: int, Fraction, NumPy integer or float to convert to an exact Python number
+    """
+    if isinstance(x, (int, Fraction)):
+        return x
+    if isinstance(x, float):
+        return Fraction(x)
+    return int(x)
+
+
+def as_columns(B):
+    """
+    The basis vectors of B as lists of ints and Fractions, and a function converting such columns back to the kind of B
+    B: Basis in any of the supported forms, the columns of B[r][c] are the basis vectors whatever its type
+    """
+    if type(B).__module__.startswith("sage."):
+        from sage_adapter import to_columns, from_columns
+        return to_columns(B), lambda columns: from_columns(columns, B)
+    if hasattr(B, "shape"):
+        import numpy as np
+        columns = [[_number(x) for x in B[:, j]] for j in range(B.shape[1])]
+
+        def to_array(columns):
+            A = np.array(columns, dtype=object).T
+            if B.dtype != object and all(isinstance(x, int) and -2**63 <= x < 2**63 for column in columns for x in column):
+                return A.astype(B.dtype)
+            return A
+        return columns, to_array
+    rows = [[_number(x) for x in row] for row in B]
+    return _transpose(rows), _transpose
+
+
+def _transpose(vectors):
+    return [list(v) for v in zip(*vectors)]
+
+
+def _dot(u, v):
+    return sum(a * b for a, b in zip(u, v))
+
+
+def _round(x):
+    """
+    Round to the nearest integer with halves away from zero, like Sage does for rationals
+    """
+    return floor(x + Fraction(1, 2)) if x >= 0 else -floor(-x + Fraction(1, 2))
 
 
 def check_orthogonal(B):
     """
-    B: Matrix whose columns are vectors to be checked for orthogonality
+    B: Basis whose columns are vectors to be checked for orthogonality
     """
-    m = B.ncols()
+    columns, _ = as_columns(B)
+    m = len(columns)
     for i in range(m):
         for j in range(i):
-            if abs(B.column(i).dot_product(B.column(j))) > 1e-6:
+            if abs(_dot(columns[i], columns[j])) > 1e-6:
                 return False
     return True
 
 
-def check_LLL_condition(B, delta=0.75):
+def check_LLL_condition(B, delta=0.75, eta=0.5):
     """
-    B: Matrix whose columns are basis vectors to be checked
+    B: Basis whose columns are basis vectors to be checked
     delta: Reduction parameter
+    eta: Size reduction bound, FP_ETA for bases reduced with method "fp"
     """
-    m = B.ncols()
-    Bs = gram_schmidt(B)
+    columns, _ = as_columns(B)
+    m = len(columns)
+    Mu, Bn = _gram_schmidt_coefficients(columns)
 
     # Size reduction
     for i in range(m):
         for j in range(i):
-            if abs(mu(i, j, B, Bs)) > 0.5:
+            if abs(Mu[i][j]) > eta:
                 return False
 
     # Lovasz condition
+    delta = Fraction(delta)
     for i in range(1, m):
-        if Bs.column(i).dot_product(Bs.column(i)) < (delta - mu(i, i-1, B, Bs)**2) * Bs.column(i-1).dot_product(Bs.column(i-1)):
+        if Bn[i] < (delta - Mu[i][i-1]**2) * Bn[i-1]:
             return False
 
     return True
@@ -40,53 +107,483 @@ def mu(i, j, B, Bs):
     Calculate the Gram-Schmidt coefficient
     i: index of the column of B
     j: index of the column of Bs
-    B: Matrix whose columns are basis vectors
-    Bs: Matrix whose columns are orthogonalized basis vectors
+    B: Basis whose columns are basis vectors
+    Bs: Basis whose columns are orthogonalized basis vectors
     """
-    return B.column(i).dot_product(Bs.column(j)) / Bs.column(j).dot_product(Bs.column(j))
+    b = as_columns(B)[0][i]
+    bs = as_columns(Bs)[0][j]
+    return Fraction(_dot(b, bs)) / _dot(bs, bs)
 
 
 def gram_schmidt(B):
     """
-    Orthogonalize the columns of matrix B using Gram-Schmidt process
-    B: Matrix whose columns are vectors to be orthogonalized
+    Orthogonalize the columns of B using Gram-Schmidt process
+    B: Basis whose columns are vectors to be orthogonalized
     """
-    m = B.ncols()
-    Bs = Matrix(QQ, B.nrows(), m)
-    Bs[:, 0] = B.column(0)
-    for i in range(1, m):
-        v = B.column(i)
-        for j in range(i):
-            proj = mu(i, j, B, Bs) * Bs.column(j)
-            v = v - proj
-        Bs[:, i] = v
+    columns, convert = as_columns(B)
+    return convert(_gram_schmidt(columns))
+
+
+def _gram_schmidt(columns):
+    """
+    columns: list of vectors to be orthogonalized
+    """
+    Bs = []
+    for b in columns:
+        v = [Fraction(x) for x in b]
+        for bs in Bs:
+            c = _dot(b, bs) / _dot(bs, bs)
+            v = [x - c * y for x, y in zip(v, bs)]
+        Bs.append(v)
     return Bs
 
 
-def LLL(B, delta=0.75):
+def gram_schmidt_coefficients(B):
     """
-    Perform LLL reduction on matrix B with reduction parameter delta
-    B: Matrix whose columns are basis vectors to be reduced
+    Gram-Schmidt coefficients and squared norms of the orthogonalized columns of B
+    B: Basis whose columns are basis vectors
+    Returns (Mu, Bn) with Mu[i][j] = mu(i, j, B, Bs) for j < i and Bn[i] = |Bs_i|^2
+    """
+    return _gram_schmidt_coefficients(as_columns(B)[0])
+
+
+def _gram_schmidt_coefficients(columns):
+    Bs = _gram_schmidt(columns)
+    m = len(columns)
+    Bn = [_dot(bs, bs) for bs in Bs]
+    Mu = [[Fraction(0)] * m for _ in range(m)]
+    for i in range(m):
+        for j in range(i):
+            Mu[i][j] = _dot(columns[i], Bs[j]) / Bn[j]
+    return Mu, Bn
+
+
+def solve_coordinates(B, y):
+    """
+    The coefficients x with B x = y, as Fractions
+    B: Basis whose columns are linearly independent basis vectors
+    y: vector in the span of the columns of B
+    """
+    columns, _ = as_columns(B)
+    n = len(columns)
+    # augmented rows [b_1[r], ..., b_n[r], y[r]]
+    rows = [[Fraction(column[r]) for column in columns] + [Fraction(_number(y[r]))] for r in range(len(y))]
+    pivot_row = 0
+    pivots = []
+    for c in range(n):
+        pivot = next((r for r in range(pivot_row, len(rows)) if rows[r][c] != 0), None)
+        if pivot is None:
+            raise ValueError("The basis vectors are linearly dependent")
+        rows[pivot_row], rows[pivot] = rows[pivot], rows[pivot_row]
+        for r in range(len(rows)):
+            if r != pivot_row and rows[r][c] != 0:
+                factor = rows[r][c] / rows[pivot_row][c]
+                rows[r] = [a - factor * b for a, b in zip(rows[r], rows[pivot_row])]
+        pivots.append(pivot_row)
+        pivot_row += 1
+    if any(row[n] != 0 for row in rows[pivot_row:]):
+        raise ValueError("The vector is not in the span of the basis")
+    return [rows[r][n] / rows[r][c] for c, r in enumerate(pivots)]
+
+
+def integral_basis(columns):
+    """
+    The columns scaled to integers by the least common denominator d of their entries, and d
+    columns: list of vectors with int or Fraction entries
+    """
+    d = lcm(*(Fraction(x).denominator for column in columns for x in column))
+    return [[int(x * d) for x in column] for column in columns], d
+
+
+def scale_basis(basis, d):
+    """
+    Undo integral_basis, dividing the integer vectors of basis by d
+    """
+    if d == 1:
+        return basis
+    return [[Fraction(x, d) for x in column] for column in basis]
+
+
+def LLL(B, delta=0.75, method="exact", deep=None, stats: dict = None, progress=None, track_bits: bool = False,
+        stop=None):
+    """
+    Perform LLL reduction on basis B with reduction parameter delta
+    B: Basis whose columns are basis vectors to be reduced
     delta: Reduction parameter
+    method: "exact" for rational Gram-Schmidt arithmetic, "fp" for floating-point Gram-Schmidt on the
+        exact integer basis (size reduced up to FP_ETA instead of 1/2), much faster on large entries
+    deep: None for swaps of neighbouring vectors only, otherwise deep insertion: a vector b_k may be moved to
+        any position i < k with i < deep or k - i <= deep where it shortens the orthogonalized basis vector
+    stats: dict filled with the counters and phase timings of the reduction, see LLLMonitor
+    progress: function called with the stats after every swap or insertion, which also hold the current index "k"
+        and the base 2 logarithm of the potential prod |b*_i|^(2(m-i)) in "log_potential"
+    track_bits: Record the largest bit size of the basis entries after every swap or insertion in stats["bits"]
+    stop: predicate on the first basis vector, the reduction returns the current basis as soon as it holds
+
+    The Gram-Schmidt coefficients Mu and the squared norms Bn are computed once and then updated
+    with every size reduction and swap, instead of orthogonalizing the whole basis again
     """
     if not (0.25 < delta < 1):
         raise ValueError("delta should be in (1/4, 1)")
+    if deep is not None and deep < 1:
+        raise ValueError("deep should be at least 1")
+    columns, convert = as_columns(B)
+    if method == "fp":
+        basis, d = integral_basis(columns)
+        first = None if stop is None else lambda b: stop(scale_basis([b], d)[0])
+        monitor = LLLMonitor(stats, progress, track_bits, first, d)
+        return convert(scale_basis(lll_fp(basis, delta, deep, monitor), d))
+    if method != "exact":
+        raise ValueError(f"Unknown LLL method {method}")
+    monitor = LLLMonitor(stats, progress, track_bits, stop)
+    return convert(lll_exact(columns, delta, deep, monitor))
+
+
+class LLLMonitor:
+    """
+    Counters, phase timings and callbacks of one LLL reduction. The stats dict gets
+    iterations: iterations of the main loop
+    swaps: swaps of neighbouring basis vectors
+    deep_insertions: insertions of a basis vector more than one position forward
+    size_reductions: subtractions of a multiple of a basis vector from another
+    gs_updates: updates of the Gram-Schmidt data, computed rows in the floating-point LLL
+    time: seconds spent on "gram_schmidt", "size_reduction" and "swaps", in the floating-point LLL the rows of
+        the Gram-Schmidt data are computed during size reduction. The Lovasz and deep insertion tests count as size
+        reduction, "swaps" only covers actual swaps and insertions
+    stopped: whether the stop predicate ended the reduction
+    bits: largest bit size of the entries at the start and after every swap or insertion, with track_bits
+    """
 
-    BB = copy(B)
-    Bs = gram_schmidt(BB)
-    m = BB.ncols()
+    def __init__(self, stats: dict = None, progress=None, track_bits: bool = False, stop=None, scale=1):
+        self.stats = {} if stats is None else stats
+        self.stats.update(iterations=0, swaps=0, deep_insertions=0, size_reductions=0, gs_updates=0, stopped=False,
+                          time={"gram_schmidt": 0.0, "size_reduction": 0.0, "swaps": 0.0})
+        if track_bits:
+            self.stats["bits"] = []
+        self.progress = progress
+        self.track_bits = track_bits
+        self.stop = stop
+        # the floating-point LLL reduces the basis multiplied by scale
+        self.scale = scale
+        self.log_potential = None
+        self.clock = perf_counter()
+
+    def charge(self, phase):
+        """
+        Add the time since the last charge to phase
+        """
+        now = perf_counter()
+        self.stats["time"][phase] += now - self.clock
+        self.clock = now
+
+    def start(self, basis, Bn=None):
+        """
+        Called before the reduction starts, returns True if it should stop right away
+        basis: list of basis vectors
+        Bn: squared norms of the orthogonalized basis vectors if they are known
+        """
+        if self.progress is not None and self.log_potential is None:
+            self._potential(basis, Bn)
+        if self.track_bits and not self.stats["bits"]:
+            self.stats["bits"].append(_bit_size(basis, self.scale))
+        return self._stopped(basis)
+
+    def swapped(self, basis, k, old_norm, new_norm):
+        """
+        Called after the basis vectors k-1 and k were swapped, returns True if the reduction should stop
+        old_norm: squared norm of the orthogonalized vector k-1 before the swap
+        new_norm: squared norm of the orthogonalized vector k-1 after the swap
+        """
+        self.stats["swaps"] += 1
+        if self.progress is not None:
+            # only the Gram determinant of the first k vectors changes
+            self.log_potential += _log2(new_norm) - _log2(old_norm)
+        return self._changed(basis, k - 1)
+
+    def inserted(self, basis, i, Bn=None):
+        """
+        Called after a basis vector was inserted at position i, returns True if the reduction should stop
+        Bn: squared norms of the orthogonalized basis vectors if they are known
+        """
+        self.stats["deep_insertions"] += 1
+        if self.progress is not None:
+            self._potential(basis, Bn)
+        return self._changed(basis, i)
+
+    def _potential(self, basis, Bn):
+        if Bn is None:
+            Bn = _gram_schmidt_coefficients(basis)[1]
+        m = len(Bn)
+        self.log_potential = sum((m - i) * _log2(Bn[i]) for i in range(m)) - m * (m + 1) * log2(self.scale)
+
+    def _changed(self, basis, i):
+        if self.track_bits:
+            self.stats["bits"].append(_bit_size(basis, self.scale))
+        if self.progress is not None:
+            self.progress(dict(self.stats, k=i, log_potential=self.log_potential))
+        return i == 0 and self._stopped(basis)
+
+    def _stopped(self, basis):
+        if self.stop is not None and self.stop(basis[0]):
+            self.stats["stopped"] = True
+        return self.stats["stopped"]
+
+
+def _log2(x):
+    if isinstance(x, Fraction):
+        return log2(x.numerator) - log2(x.denominator)
+    if isinstance(x, Decimal):
+        return float(x.ln() / Decimal(2).ln())
+    return log2(x)
+
+
+def _bit_size(basis, scale=1):
+    """
+    Largest bit size of a numerator or denominator of the entries of basis divided by scale
+    """
+    return max(max(abs(y.numerator).bit_length(), y.denominator.bit_length())
+               for b in basis for y in (Fraction(x) / scale for x in b))
+
+
+def lll_exact(columns, delta=0.75, deep=None, monitor: LLLMonitor = None):
+    """
+    LLL reduction with exact rational Gram-Schmidt data
+    columns: list of basis vectors with int or Fraction entries
+    delta: Reduction parameter
+    deep: Depth of deep insertions, None for swaps of neighbouring vectors only
+    monitor: LLLMonitor recording the reduction
+    Returns the reduced basis as a list of vectors
+    """
+    monitor = LLLMonitor() if monitor is None else monitor
+    stats = monitor.stats
+    BB = [list(b) for b in columns]
+    Mu, Bn = _gram_schmidt_coefficients(BB)
+    monitor.charge("gram_schmidt")
+    if monitor.start(BB, Bn):
+        return BB
+    delta = Fraction(delta)
+    m = len(BB)
     i = 1
     while i < m:
+        stats["iterations"] += 1
         for j in range(i-1, -1, -1):
-            mus = mu(i, j, BB, Bs) 
-            if abs(mus) > 0.5:
-                BB[:, i] -= round(mus) * BB[:, j]
-                Bs = gram_schmidt(BB)
-        if Bs.column(i).dot_product(Bs.column(i)) <= (delta - mu(i, i-1, BB, Bs)**2) * Bs.column(i-1).dot_product(Bs.column(i-1)):
-            BB.swap_columns(i, i-1)
+            if abs(Mu[i][j]) > Fraction(1, 2):
+                r = _round(Mu[i][j])
+                BB[i] = [a - r * b for a, b in zip(BB[i], BB[j])]
+                for k in range(j):
+                    Mu[i][k] -= r * Mu[j][k]
+                Mu[i][j] -= r
+                stats["size_reductions"] += 1
+                stats["gs_updates"] += 1
+        l = i - 1 if Bn[i] <= (delta - Mu[i][i-1]**2) * Bn[i-1] else None
+        if deep is not None:
+            # the first position j where b_i shortens the orthogonalized basis, C is the squared norm of the
+            # projection of b_i orthogonal to b_0, ..., b_{j-1}
+            C = Fraction(_dot(BB[i], BB[i]))
+            for j in range(i - 1):
+                if (j < deep or i - j <= deep) and C <= delta * Bn[j]:
+                    l = j
+                    break
+                C -= Mu[i][j]**2 * Bn[j]
+        monitor.charge("size_reduction")
+        if l is None:
+            i += 1
+        elif l == i - 1:
+            old_norm = Bn[i-1]
+            BB[i-1], BB[i] = BB[i], BB[i-1]
+            _swap_update(Mu, Bn, i)
+            stats["gs_updates"] += 1
+            stop = monitor.swapped(BB, i, old_norm, Bn[i-1])
+            monitor.charge("swaps")
+            if stop:
+                break
             i = max(i-1, 1)
-            Bs = gram_schmidt(BB)
         else:
-            i += 1
+            BB.insert(l, BB.pop(i))
+            monitor.charge("swaps")
+            _gram_schmidt_rows(BB, Mu, Bn, l)
+            stats["gs_updates"] += 1
+            monitor.charge("gram_schmidt")
+            stop = monitor.inserted(BB, l, Bn)
+            monitor.charge("swaps")
+            if stop:
+                break
+            i = max(l, 1)
 
     return BB
+
+
+def _gram_schmidt_rows(B, Mu, Bn, start):
+    """
+    Recompute the Gram-Schmidt data of the columns start, start+1, ... of B from their inner products,
+    the rows before start are kept
+    Mu: Gram-Schmidt coefficients, updated in place
+    Bn: squared norms of the orthogonalized columns, updated in place
+    """
+    m = len(B)
+    for i in range(start, m):
+        # r[j] = <b_i, b*_j> = <b_i, b_j> - sum_l Mu[j][l] <b_i, b*_l>
+        r = []
+        for j in range(i):
+            r.append(_dot(B[i], B[j]) - sum(Mu[j][l] * r[l] for l in range(j)))
+            Mu[i][j] = Fraction(r[j]) / Bn[j]
+        Bn[i] = _dot(B[i], B[i]) - sum(Mu[i][j] * r[j] for j in range(i))
+
+
+def _swap_update(Mu, Bn, k):
+    """
+    Update the Gram-Schmidt data after the columns k-1 and k of the basis were swapped
+    Mu: Gram-Schmidt coefficients, updated in place
+    Bn: squared norms of the orthogonalized columns, updated in place
+    k: index of the second swapped column
+    """
+    m = len(Bn)
+    mu_k = Mu[k][k-1]
+    Bn_new = Bn[k] + mu_k**2 * Bn[k-1]
+    Mu[k][k-1] = mu_k * Bn[k-1] / Bn_new
+    Bn[k] = Bn[k-1] * Bn[k] / Bn_new
+    Bn[k-1] = Bn_new
+    for j in range(k-1):
+        Mu[k-1][j], Mu[k][j] = Mu[k][j], Mu[k-1][j]
+    for l in range(k+1, m):
+        t = Mu[l][k]
+        Mu[l][k] = Mu[l][k-1] - mu_k * t
+        Mu[l][k-1] = t + Mu[k][k-1] * Mu[l][k]
+
+
+class _PrecisionError(ArithmeticError):
+    pass
+
+
+def lll_fp(columns, delta=0.75, deep=None, monitor: LLLMonitor = None):
+    """
+    LLL reduction in the style of Schnorr-Euchner and L^2: the basis stays exact, the Gram-Schmidt data is computed
+    in floating point from exact inner products. Doubles are tried first, when they overflow or lose too much
+    precision the reduction continues from the current basis with Decimal arithmetic of increasing precision
+    columns: list of integer basis vectors
+    delta: Reduction parameter
+    deep: Depth of deep insertions, None for swaps of neighbouring vectors only
+    monitor: LLLMonitor recording the reduction
+    Returns the reduced basis as a list of integer vectors
+    """
+    monitor = LLLMonitor() if monitor is None else monitor
+    basis = [[int(x) for x in b] for b in columns]
+    if monitor.start(basis):
+        return basis
+    precision = None
+    while True:
+        try:
+            _lll_fp_pass(basis, delta, precision, deep, monitor)
+            return basis
+        except (_PrecisionError, OverflowError):
+            precision = 40 if precision is None else 2 * precision
+            if precision > FP_MAX_PRECISION:
+                raise ArithmeticError("LLL did not converge, the basis vectors may be linearly dependent")
+
+
+def _lll_fp_pass(basis, delta, precision, deep, monitor):
+    """
+    One floating-point LLL run, reducing basis in place
+    basis: list of integer basis vectors
+    delta: Reduction parameter
+    precision: Decimal digits, or None for doubles
+    deep: Depth of deep insertions, None for swaps of neighbouring vectors only
+    monitor: LLLMonitor recording the reduction
+    """
+    stats = monitor.stats
+    m = len(basis)
+    fp = float if precision is None else Decimal
+    with nullcontext() if precision is None else localcontext() as ctx:
+        if precision is not None:
+            ctx.prec = precision
+        delta = fp(float(delta))
+        eta = fp(FP_ETA)
+        r = [[fp(0)] * m for _ in range(m)]
+        mu = [[fp(0)] * m for _ in range(m)]
+        r[0][0] = fp(_dot(basis[0], basis[0]))
+        k = 1
+        while k < m:
+            stats["iterations"] += 1
+            _size_reduce_fp(basis, r, mu, k, fp, eta, stats)
+            # C is the squared norm of the projection of b_k orthogonal to b_0, ..., b_{k-2}
+            C = r[k][k] + mu[k][k-1] * r[k][k-1]
+            l = k - 1 if C <= delta * r[k-1][k-1] else None
+            if deep is not None:
+                # the first position j where b_k shortens the orthogonalized basis
+                C_j = fp(_dot(basis[k], basis[k]))
+                for j in range(k - 1):
+                    if (j < deep or k - j <= deep) and C_j <= delta * r[j][j]:
+                        l = j
+                        break
+                    C_j -= mu[k][j] * r[k][j]
+            monitor.charge("size_reduction")
+            if l is None:
+                k += 1
+                continue
+            if l == k - 1:
+                old_norm = r[k-1][k-1]
+                basis[k-1], basis[k] = basis[k], basis[k-1]
+            else:
+                basis.insert(l, basis.pop(k))
+            monitor.charge("swaps")
+            if l == 0:
+                r[0][0] = fp(_dot(basis[0], basis[0]))
+                monitor.charge("gram_schmidt")
+            stop = monitor.swapped(basis, k, old_norm, C) if l == k - 1 else monitor.inserted(basis, l)
+            monitor.charge("swaps")
+            if stop:
+                return
+            k = max(l, 1)
+
+
+def _size_reduce_fp(basis, r, mu, k, fp, eta, stats):
+    """
+    Size reduce basis vector k against the previous ones and compute row k of r = <b_k, b*_j> and mu
+    from the exact inner products, repeated until every |mu[k][j]| <= eta
+    """
+    for _ in range(FP_SIZE_REDUCTION_ROUNDS):
+        for j in range(k):
+            r[k][j] = fp(_dot(basis[k], basis[j])) - sum((mu[j][l] * r[k][l] for l in range(j)), fp(0))
+            mu[k][j] = r[k][j] / r[j][j]
+        stats["gs_updates"] += 1
+        if all(abs(mu[k][j]) <= eta for j in range(k)):
+            break
+        for j in range(k-1, -1, -1):
+            X = round(mu[k][j])
+            if X:
+                basis[k] = [a - X * b for a, b in zip(basis[k], basis[j])]
+                for l in range(j):
+                    mu[k][l] -= X * mu[j][l]
+                mu[k][j] -= X
+                stats["size_reductions"] += 1
+    else:
+        raise _PrecisionError()
+    r[k][k] = fp(_dot(basis[k], basis[k])) - sum((mu[k][j] * r[k][j] for j in range(k)), fp(0))
+    if r[k][k] <= 0:
+        raise _PrecisionError()
+
+
+def _gram_schmidt_fp(basis):
+    """
+    Gram-Schmidt coefficients and squared norms of the orthogonalized basis vectors as floats, computed from exact
+    inner products, or from exact rational Gram-Schmidt when the entries are too large for doubles
+    basis: list of integer basis vectors
+    """
+    m = len(basis)
+    try:
+        r = [[0.0] * m for _ in range(m)]
+        Mu = [[0.0] * m for _ in range(m)]
+        Bn = [0.0] * m
+        for i in range(m):
+            for j in range(i + 1):
+                r[i][j] = float(_dot(basis[i], basis[j])) - sum(Mu[j][l] * r[i][l] for l in range(j))
+                if j < i:
+                    Mu[i][j] = r[i][j] / r[j][j]
+            Bn[i] = r[i][i]
+            if not (isfinite(Bn[i]) and Bn[i] > 0):
+                raise OverflowError()
+        return Mu, Bn
+    except OverflowError:
+        Mu, Bn = _gram_schmidt_coefficients(basis)
+        scale = max(Bn)
+        return [[float(x) for x in row] for row in Mu], [float(b / scale) for b in Bn]
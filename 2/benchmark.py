@@ -0,0 +1,194 @@
+from LLL import LLL, as_columns, gram_schmidt_coefficients, check_LLL_condition, FP_ETA, _dot, _gram_schmidt, _round
+from knapsack import knapsack_lattice, knapsack_composition, solve_knapsack_lll
+from fractions import Fraction
+import random
+import subprocess
+import sys
+import time
+
+
+def timed(function, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def lll_recompute(B, delta=0.75):
+    """
+    The LLL reduction that orthogonalizes the whole basis again after every size reduction and swap,
+    kept as the reference for the incremental version
+    B: Basis whose columns are basis vectors to be reduced
+    delta: Reduction parameter
+    """
+    BB, convert = as_columns(B)
+    Bs = _gram_schmidt(BB)
+
+    def mu(i, j):
+        return Fraction(_dot(BB[i], Bs[j])) / _dot(Bs[j], Bs[j])
+
+    delta = Fraction(delta)
+    m = len(BB)
+    i = 1
+    while i < m:
+        for j in range(i-1, -1, -1):
+            mus = mu(i, j)
+            if abs(mus) > Fraction(1, 2):
+                BB[i] = [a - _round(mus) * b for a, b in zip(BB[i], BB[j])]
+                Bs = _gram_schmidt(BB)
+        if sum(x * x for x in Bs[i]) <= (delta - mu(i, i-1)**2) * sum(x * x for x in Bs[i-1]):
+            BB[i-1], BB[i] = BB[i], BB[i-1]
+            i = max(i-1, 1)
+            Bs = _gram_schmidt(BB)
+        else:
+            i += 1
+    return convert(BB)
+
+
+def random_knapsack_lattice(m, bits):
+    """
+    The lattice solve_knapsack_lll reduces, for m random values of the given bit size
+    m: number of values
+    bits: bit size of the values
+    """
+    values = [random.getrandbits(bits) for _ in range(m)]
+    return knapsack_lattice(values, sum(v for v in values if random.random() < 0.5))
+
+
+def gram_determinant(B):
+    """
+    det(B^T B), equal for all bases of the same lattice
+    B: list of basis vectors
+    """
+    result = Fraction(1)
+    for norm in gram_schmidt_coefficients(B)[1]:
+        result *= norm
+    return result
+
+
+def _first_norm(B):
+    """
+    Squared norm of the first basis vector, the first column of B
+    """
+    return sum(x * x for x in as_columns(B)[0][0])
+
+
+def bench_incremental_gram_schmidt(sizes=(4, 6, 8, 10, 12), bits=20):
+    """
+    Running time of LLL against the recomputing reference on knapsack lattices of growing dimension
+    sizes: numbers of knapsack values
+    bits: bit size of the values
+    """
+    for m in sizes:
+        A = random_knapsack_lattice(m, bits)
+        reference_time, reference = timed(lambda: lll_recompute(A))
+        incremental_time, reduced = timed(lambda: LLL(A))
+        if reduced != reference:
+            raise ArithmeticError("incremental LLL differs from the reference")
+        print(f"dimension {m+1:>3}: {reference_time:.3f} s recomputing, {incremental_time:.3f} s incremental ({reference_time / incremental_time:.1f}x)")
+
+
+def bench_fp_lll(m=10, sizes=(20, 50, 100, 200)):
+    """
+    Exact rational LLL against the floating-point LLL on knapsack lattices with values of growing bit size,
+    the floating-point result is checked to be a reduced basis of the same lattice
+    m: number of knapsack values
+    sizes: bit sizes of the values
+    """
+    for bits in sizes:
+        A = random_knapsack_lattice(m, bits)
+        exact_time, exact = timed(lambda: LLL(A, method="exact"))
+        fp_time, reduced = timed(lambda: LLL(A, method="fp"))
+        if gram_determinant(reduced) != gram_determinant(A) or not check_LLL_condition(reduced, 0.74, FP_ETA):
+            raise ArithmeticError("floating-point LLL didn't return a reduced basis of the lattice")
+        print(f"{bits:>4} bit values: {exact_time:.3f} s exact, {fp_time:.3f} s floating point ({exact_time / fp_time:.1f}x), "
+              f"|b1|^2 {_first_norm(exact)} exact, {_first_norm(reduced)} floating point")
+
+
+def bench_bkz_knapsack(m=26, trials=10):
+    """
+    Success rate and running time of the knapsack solver with LLL only and with BKZ escalation,
+    on knapsacks of density 1
+    m: number of knapsack values
+    trials: number of random knapsacks
+    """
+    for block_sizes in ((), (10, 20)):
+        solved = 0
+        total = 0
+        for trial in range(trials):
+            random.seed(trial)
+            values = [random.getrandbits(m) for _ in range(m)]
+            N = sum(v for v in values if random.random() < 0.5)
+            elapsed, x = timed(lambda: solve_knapsack_lll(values, N, block_sizes=block_sizes))
+            total += elapsed
+            if x is not None:
+                if sum(v * xi for v, xi in zip(values, x)) != N:
+                    raise ArithmeticError("knapsack solver returned a wrong composition")
+                solved += 1
+        name = "LLL" if not block_sizes else "LLL + BKZ-" + "/".join(map(str, block_sizes))
+        print(f"{name:>16}: {solved}/{trials} solved, {total / trials:.3f} s per knapsack")
+
+
+def bench_deep_insertion(m=20, bits=60, depths=(None, 1, 3, 20)):
+    """
+    Swaps, insertions, size reductions, phase timings and |b1|^2 of LLL with and without deep insertion,
+    as reported in the stats of the reduction
+    m: number of knapsack values
+    bits: bit size of the values
+    depths: deep insertion depths, None for plain LLL
+    """
+    random.seed(0)
+    A = random_knapsack_lattice(m, bits)
+    for method in ("exact", "fp"):
+        for deep in depths:
+            stats = {}
+            elapsed, reduced = timed(lambda: LLL(A, method=method, deep=deep, stats=stats))
+            phases = ", ".join(f"{phase} {t:.3f} s" for phase, t in stats["time"].items())
+            print(f"{method:>5} deep={str(deep):>4}: {elapsed:.3f} s, {stats['swaps']} swaps, {stats['deep_insertions']} "
+                  f"insertions, {stats['size_reductions']} size reductions ({phases}), |b1|^2 {_first_norm(reduced)}")
+
+
+def bench_early_exit(m=24, trials=10):
+    """
+    LLL stopping as soon as the first basis vector is a knapsack solution, as the knapsack solver runs it,
+    against the complete LLL reduction
+    m: number of knapsack values
+    trials: number of random knapsacks of density 0.5
+    """
+    complete = 0.0
+    early = 0.0
+    stopped = 0
+    for trial in range(trials):
+        random.seed(trial)
+        values = [random.getrandbits(2 * m) for _ in range(m)]
+        A = knapsack_lattice(values, sum(v for v in values if random.random() < 0.5))
+        complete += timed(lambda: LLL(A, method="fp"))[0]
+        stats = {}
+        early += timed(lambda: LLL(A, method="fp", stats=stats, stop=lambda y: knapsack_composition(A, y) is not None))[0]
+        stopped += stats["stopped"]
+    print(f"complete LLL {complete / trials:.3f} s, with early exit {early / trials:.3f} s, stopped early in {stopped}/{trials}")
+
+
+def bench_startup(repeat=3):
+    """
+    Time for a new process to import the lattice code and solve a small knapsack, and whether Sage was loaded
+    repeat: number of processes, the fastest is reported
+    """
+    script = ("import sys; from knapsack import solve_knapsack_lll\n"
+              "solve_knapsack_lll([62, 93, 81, 88, 102, 37], 174)\n"
+              "print('sage' in sys.modules)\n")
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True)
+        times.append(time.perf_counter() - start)
+    print(f"new process solving a knapsack: {min(times):.3f} s, Sage imported: {result.stdout.strip()}")
+
+
+if __name__ == '__main__':
+    bench_incremental_gram_schmidt()
+    bench_fp_lll()
+    bench_bkz_knapsack()
+    bench_deep_insertion()
+    bench_early_exit()
+    bench_startup()
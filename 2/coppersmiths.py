@@ -1,5 +1,6 @@
 from sage.all import *
 from LLL import LLL
+from BKZ import BKZ
 
 def g(u, v, N, m, f, x):
     """
@@ -12,10 +13,13 @@ def g(u, v, N, m, f, x):
     p = N**(m-v)
     return p * x**u * f**v
 
-def coppersmiths(c, N):
+def coppersmiths(c, N, method="fp", block_sizes=(10, 20)):
     """
     c: coefficients of the polynomial, from the lowest degree to the highest
     N: modulus of the polynomial
+    method: LLL method, "fp" or "exact"
+    block_sizes: BKZ block sizes tried in turn when the LLL reduced basis for the first bound X gives a constant
+        polynomial, before X is lowered. Smaller bounds only get LLL
     """    
 
     R = PolynomialRing(ZZ, 'x')
@@ -42,14 +46,15 @@ def coppersmiths(c, N):
             for j in range(len(coef)):
                 A[i, j] = coef[j] * X**j
 
-        # LLL reduction
-        B = LLL(A)
-        u = A.inverse() * B.column(0)
-        h = sum(u[i] * gs[i] for i in range(len(u)))
-        if h.degree() > 0: 
-            return h
-        else:
-            err += 0.01
-            if err > d:
-                raise ValueError("Failed to find a solution")
-            continue
+        # LLL reduction, and for the first bound BKZ reductions of increasing block size if it isn't enough
+        B = LLL(A, method=method)
+        for block_size in (None,) + (tuple(block_sizes) if err == 0 else ()):
+            if block_size is not None:
+                B = BKZ(B, block_size)
+            u = A.inverse() * B.column(0)
+            h = sum(u[i] * gs[i] for i in range(len(u)))
+            if h.degree() > 0:
+                return h
+        err += 0.01
+        if err > d:
+            raise ValueError("Failed to find a solution")
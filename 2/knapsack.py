@@ -1,5 +1,7 @@
-from sage.all import *
-from LLL import LLL
+from fractions import Fraction
+from math import log2
+from LLL import LLL, as_columns, solve_coordinates
+from BKZ import BKZ
 
 
 def knapsack_density(values):
@@ -7,39 +9,84 @@ def knapsack_density(values):
     values: list of integers
     N: knapsack value
     '''
-    mm = max([log(v, 2) for v in values])
+    mm = max([log2(v) for v in values])
     return len(values) / mm
 
 
-def solve_knapsack_lll(values, N, printline: bool = False):
+def knapsack_lattice(values, N):
     '''
+    The basis whose columns are (e_i, values[i]) and (1/2, ..., 1/2, N)
     values: list of integers
     N: knapsack value
     '''
-    print(
-        f"Knapsack density: {knapsack_density(values)}") if printline else None
     m = len(values)
-    A = matrix(QQ, m+1, m+1)
-
+    A = [[0] * (m+1) for _ in range(m+1)]
     for i in range(m):
-        A[i, i] = 1
-        A[m, i] = copy(values[i])
-        A[i, m] = 1/2
-    A[m, m] = N
+        A[i][i] = 1
+        A[m][i] = values[i]
+        A[i][m] = Fraction(1, 2)
+    A[m][m] = N
+    return A
+
+
+def solve_knapsack_lll(values, N, printline: bool = False, method: str = "fp", block_sizes=(10, 20),
+                       stats: dict = None):
+    '''
+    values: list of integers
+    N: knapsack value
+    method: LLL method, "fp" or "exact"
+    block_sizes: BKZ block sizes tried in turn when the LLL reduced basis has no solution vector
+    stats: dict filled with the statistics of the LLL reduction, see LLLMonitor
+    '''
+    print(
+        f"Knapsack density: {knapsack_density(values)}") if printline else None
+    A = knapsack_lattice(values, N)
     print(f"A = {A}") if printline else None
-    B = LLL(A)
+    # LLL stops as soon as a solution vector is the first basis vector
+    B = LLL(A, method=method, stats=stats, stop=lambda y: knapsack_composition(A, y) is not None)
     print(f"B = {B}") if printline else None
-    Ai = A.inverse()
-    for i in range(m+1):
-        y = B.column(i)
+    x = knapsack_solution(A, B, printline)
+    for block_size in block_sizes:
+        if x is not None:
+            break
+        B = BKZ(B, block_size)
+        print(f"BKZ-{block_size}: B = {B}") if printline else None
+        x = knapsack_solution(A, B, printline)
+    return x
+
+
+def knapsack_solution(A, B, printline: bool = False):
+    '''
+    The knapsack composition given by a vector of the reduced basis B, or None if none of them is a solution vector
+    A: knapsack lattice
+    B: reduced basis of A
+    '''
+    for y in as_columns(B)[0]:
         print(f"y = {y}") if printline else None
-        x = Ai * y
+        x = knapsack_composition(A, y)
         print(f"x = {x}") if printline else None
-        if x[m] == 0 or any([(xi > 0 if x[m] > 0 else xi < 0) for xi in x[:-1]]):
-            continue
-        v = x[m]
-        x = x[:-1]
-        x = [xi/-v for xi in x]
-        return x
-
-    return None
\ No newline at end of file
+        if x is not None:
+            return x
+
+    return None
+
+
+def knapsack_composition(A, y):
+    '''
+    The knapsack composition given by y, or None if y isn't a solution vector
+    A: knapsack lattice
+    y: vector of the lattice
+    '''
+    m = len(A) - 1
+    # only a vector (+-1/2, ..., +-1/2, 0) gives a composition, checked before solving for its coordinates
+    if y[m] != 0 or any(abs(yi) != Fraction(1, 2) for yi in y[:-1]):
+        return None
+    x = solve_coordinates(A, y)
+    if x[m] == 0 or any([(xi > 0 if x[m] > 0 else xi < 0) for xi in x[:-1]]):
+        return None
+    v = x[m]
+    x = x[:-1]
+    x = [xi/-v for xi in x]
+    if any(xi not in (0, 1) for xi in x):
+        return None
+    return [int(xi) for xi in x]
@@ -0,0 +1,34 @@
+from fractions import Fraction
+
+# Conversions between Sage matrices and the column lists of ints and Fractions used by LLL.py.
+# Sage is only imported here, when a Sage matrix is actually passed in
+
+
+def _number(x):
+    """
+    x: Sage integer or rational
+    """
+    if x.denominator() == 1:
+        return int(x)
+    return Fraction(int(x.numerator()), int(x.denominator()))
+
+
+def to_columns(B):
+    """
+    B: Sage matrix whose columns are basis vectors
+    """
+    return [[_number(x) for x in column] for column in B.columns()]
+
+
+def from_columns(columns, like):
+    """
+    A Sage matrix with the given columns over the base ring of like, or over QQ when an entry isn't integral
+    columns: list of vectors with int or Fraction entries
+    like: Sage matrix the result should resemble
+    """
+    from sage.all import matrix, QQ, ZZ
+    ring = like.base_ring()
+    if ring == ZZ and any(isinstance(x, Fraction) and x.denominator != 1 for column in columns for x in column):
+        ring = QQ
+    rows = [[QQ(x.numerator) / x.denominator if isinstance(x, Fraction) else x for x in column] for column in columns]
+    return matrix(ring, len(columns), len(columns[0]) if columns else like.nrows(), rows).transpose()